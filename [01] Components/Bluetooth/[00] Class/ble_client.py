@@ -6,12 +6,15 @@
 # Author: Sam Linton
 # Description: A simple BLE client that connects to a server and receives messages from it.
 #
-# TODO:
-# Switch to BLE notifications if available, otherwise fall back to polling
+# Messages are received as notifications and dispatched as soon as they arrive. If the
+# server's characteristic cannot be subscribed to, the client falls back to reading it
+# every receive_interval_ms. A message identical to the previous one is counted as a
+# duplicate and not dispatched; gaps longer than expected_interval_ms count as missed.
 #
 import aioble
 import bluetooth
 import uasyncio as asyncio
+from time import ticks_ms, ticks_diff
 
 _GENERIC_SERVICE_UUID = bluetooth.UUID(0x1848) # data service UUID
 _GENERIC_CHAR_UUID = bluetooth.UUID(0x2A6E) # characteristic UUID
@@ -33,7 +36,10 @@ class BLEClient:
                  on_disconnected_func=None,
                  receive_interval_ms:int = 1000,
                  service_uuid:bluetooth.UUID = _GENERIC_SERVICE_UUID,
-                 char_uuid:bluetooth.UUID = _GENERIC_CHAR_UUID)-> None:
+                 char_uuid:bluetooth.UUID = _GENERIC_CHAR_UUID,
+                 use_notifications:bool = True,
+                 expected_interval_ms:int = None,
+                 raw:bool = False)-> None:
         """Initialize the BLEClient object.
 
         Args:
@@ -42,9 +48,14 @@ class BLEClient:
                 Defaults to None.
             on_connected_func: (function, optional): Called when the client connects to a server
             on_disconnected_func: (function, optional): Called when the client disconnect from a server
-            receive_interval_ms (int, optional): Interval between receives, ms. Defaults to 1000.
+            receive_interval_ms (int, optional): Interval between reads when polling, ms. Defaults to 1000.
             service_uuid (UUID, optional): Service UUID. Defaults to _GENERIC_SERVICE_UUID.
             char_uuid (UUID, optional): Characteristic UUID. Defaults to _GENERIC_CHAR_UUID.
+            use_notifications (bool, optional): Receive notifications rather than polling. Defaults to True.
+            expected_interval_ms (int, optional): Server's send interval, for counting missed messages
+                when receiving notifications. Defaults to None (not counted).
+            raw (bool, optional): Pass messages to receive_message_func as bytes, e.g. joystick_protocol
+                frames, rather than decoding them to str. Defaults to False.
         """
         self.server_name = server_name
         self.receive_message_func = receive_message_func
@@ -53,8 +64,19 @@ class BLEClient:
         self.receive_interval_ms = receive_interval_ms
         self.service_uuid = service_uuid
         self.char_uuid = char_uuid
+        self.use_notifications = use_notifications
+        self.expected_interval_ms = expected_interval_ms
+        self.raw = raw
         self.connection = None
         self.characteristic = None
+        self.notifying = False # True while subscribed to notifications
+        
+        # Message statistics
+        self.received = 0
+        self.duplicates = 0
+        self.missed = 0
+        self._last_message = None
+        self._last_ticks_ms = 0
         
     def start(self)-> None:
         """Start the BLE client loop.
@@ -68,8 +90,11 @@ class BLEClient:
         while True:
             try:
                 if self.is_connected():
-                    await self.receive_message()
-                    await asyncio.sleep_ms(self.receive_interval_ms)
+                    if self.notifying:
+                        await self.receive_notification()
+                    else:
+                        await self.receive_message()
+                        await asyncio.sleep_ms(self.receive_interval_ms)
                 else:
                     if self.connection and self.on_disconnected_func:
                         print('>>>>DISCONNECTED')
@@ -91,15 +116,47 @@ class BLEClient:
         """
         return self.connection is not None and self.connection.is_connected() 
                 
+    def reset_counters(self)-> None:
+        """Zero received, duplicates and missed.
+        """
+        self.received = 0
+        self.duplicates = 0
+        self.missed = 0
+                
     async def receive_message(self)-> None:
-        """Receive a message from the server and call the user provided function if it exists.
+        """Read the characteristic and dispatch the message if it is new (polling).
         """
         message = await self.characteristic.read()
-        message_str = message.decode('utf-8')
-        print(f'Receive message: {message_str}')
+        self.dispatch(message, count_missed=False)
+        
+    async def receive_notification(self)-> None:
+        """Wait for the next notification and dispatch it. Times out after a second
+        so that the connection is checked regularly.
+        """
+        try:
+            message = await self.characteristic.notified(timeout_ms=1000)
+        except asyncio.TimeoutError:
+            return
+        self.dispatch(message)
+        
+    def dispatch(self, message: bytes, count_missed: bool = True)-> None:
+        """Update the message statistics and call the user provided function with
+        the message, unless it repeats the previous one.
+        """
+        now = ticks_ms()
+        if count_missed and self.expected_interval_ms and self._last_message is not None:
+            gap = ticks_diff(now, self._last_ticks_ms)
+            self.missed += max(0, (gap + self.expected_interval_ms // 2) // self.expected_interval_ms - 1)
+        self._last_ticks_ms = now
+        
+        if message == self._last_message:
+            self.duplicates += 1
+            return
+        self._last_message = bytes(message)
+        self.received += 1
         
         if self.receive_message_func:
-            self.receive_message_func(message_str)
+            self.receive_message_func(self._last_message if self.raw else message.decode('utf-8'))
         
     async def connect_to_server(self)-> None:
         """Connect to the server with the name server_name and service_uuid.
@@ -115,6 +172,15 @@ class BLEClient:
         self.characteristic = await service.characteristic(self.char_uuid)
         print(f'Characteristic: {self.characteristic}')
         
+        self._last_message = None
+        self.notifying = False
+        if self.use_notifications:
+            try:
+                await self.characteristic.subscribe(notify=True)
+                self.notifying = True
+            except Exception as e:
+                print(f'Notifications not available ({e}), polling')
+        
     async def find_server(self)-> aioble.Device:
         """Find the server with the name server_name and service_uuid.
 
@@ -5,11 +5,20 @@
 # Date: 2025-05-30
 # Author: Sam Linton
 #
-# 
+# By default a message is sent every send_interval_ms. With keepalive_ms set, only
+# changes are sent: create_message_func is still called every send_interval_ms, as
+# create_message_func(force), and returns None when nothing has changed enough to be
+# worth sending (see JoystickEncoder.encode_if_changed). A change is then sent at the
+# next interval, so send_interval_ms is both the latency and the minimum time between
+# sends. Once keepalive_ms passes without a send, and right after connecting, force is
+# True and the function must return the current state, so the client can tell the
+# link is alive and recover a lost message.
+#
 import aioble
 import bluetooth
 from micropython import const
 import uasyncio as asyncio
+from time import ticks_ms, ticks_diff
 
 
 _GENERIC_SERVICE_UUID = bluetooth.UUID(0x1848)
@@ -29,15 +38,19 @@ class BLEServer:
                  on_connected_func=None,
                  on_disconnected_func=None,
                  send_interval_ms:int=1000,
+                 keepalive_ms:int=None,
                  service_uuid:bluetooth.UUID=_GENERIC_SERVICE_UUID,
                  char_uuid:bluetooth.UUID=_GENERIC_CHAR_UUID)->None:
         """Initialize the BLEServer object.
 
         Args:
             name (str): Name of the BLE server. This is used by the client to recognize the server.
-            create_message_func (_type_, optional): User-proviced function that provides a string to 
-                be sent by the server. Defaults to None.
+            create_message_func (_type_, optional): User-proviced function that provides a string, or
+                bytes such as a joystick_protocol frame, to be sent by the server. Defaults to None.
             send_interval_ms (int, optional): Interval between sends, in ms. Defaults to 1000.
+            keepalive_ms (int, optional): Send only changes, calling create_message_func(force), which
+                returns None for no change, and force a message of the current state after this long
+                without a send, in ms. Defaults to None (send every interval).
             service_uuid (UUID, optional): Service UUID. Defaults to _GENERIC_SERVICE_UUID.
             char_uuid (UUID, optional): Characteristic UUID. Defaults to _GENERIC_CHAR_UUID.
         """
@@ -46,10 +59,18 @@ class BLEServer:
         self.on_connected_func = on_connected_func
         self.on_disconnected_func = on_disconnected_func
         self.send_interval_ms = send_interval_ms
+        self.keepalive_ms = keepalive_ms
         self.service_uuid = service_uuid
         self.char_uuid = char_uuid
         self.connection = None
         self.characteristic = None
+        
+        # Send statistics
+        self.sent = 0
+        self.suppressed = 0 # Intervals with nothing to send
+        self.keepalives = 0 # Sends forced because none was sent for keepalive_ms
+        self._last_send_ms = None # None to force a send at the next interval
+        
         self.createService()
         
     def start(self)->None:
@@ -69,6 +90,7 @@ class BLEServer:
                     if self.connection and self.on_disconnected_func:
                         self.on_disconnected_func()
                     await self.connect_to_client()
+                    self._last_send_ms = None
                     if self.on_connected_func:
                         self.on_connected_func()
             except Exception as e:
@@ -82,17 +104,40 @@ class BLEServer:
         """
         return not self.connection == None and self.connection.is_connected() 
         
+    def reset_counters(self)-> None:
+        """Reset the send statistics."""
+        self.sent = 0
+        self.suppressed = 0
+        self.keepalives = 0
+        
     async def send_message(self)->None:
         """Send a message to the connected client.
         If a user-provided function is defined, it will be called to create the message.
         If no function is provided, a default message 'x' will be sent.
+        Bytes are sent as they are; only a string is encoded.
+        With keepalive_ms set, the function is called as create_message_func(force), and
+        nothing is sent if it returns None.
         """
-        message_str = 'x'
+        now = ticks_ms()
+        force = self.keepalive_ms is not None and (
+            self._last_send_ms is None or ticks_diff(now, self._last_send_ms) >= self.keepalive_ms)
+        message = b'x'
         if not self.create_message_func == None:
-            message_str = self.create_message_func()
-        message = bytearray(message_str, 'utf-8')
+            if self.keepalive_ms is None:
+                message = self.create_message_func()
+            else:
+                message = self.create_message_func(force)
+        if message is None:
+            self.suppressed += 1
+            return
+        if isinstance(message, str):
+            message = message.encode('utf-8')
         self.characteristic.write(message)
         self.characteristic.notify(self.connection, message)
+        self._last_send_ms = now
+        self.sent += 1
+        if force:
+            self.keepalives += 1
         
     async def connect_to_client(self)->None:
         """Connect to a client that is advertising the service.
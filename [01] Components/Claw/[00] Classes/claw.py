@@ -9,15 +9,18 @@
 # TODO: Refactor to remove hardcoded values and improve readability.
 #
 import uasyncio as asyncio
+from joystick_protocol import JoystickState
 from gripper import Gripper
 from lifter import Lifter
 from time import sleep
 
 class Claw:
     gain: float = 30.0
+    deadband: int = 1000  # Stick movement ignored, out of 32767
     
     def __init__(self, gripper_pin: int = 17, lifter_pin: int = 16)-> None:
         # self.running = False
+        self.joystick = JoystickState()
         self.gripper = Gripper(pin=gripper_pin)
         self.lifter = Lifter(pin=lifter_pin)
         
@@ -26,30 +29,29 @@ class Claw:
         self.lifter.lift()
         sleep(0.5)
        
-    def receive_message(self, message)-> str:
-        """Receive a message from (e.g.) joystick and process it.
+    def receive_message(self, message: bytes)-> None:
+        """Receive a message from (e.g.) joystick, decode it and process it.
         Args:
-            message (str): The message received from the BLE client.
-        Returns:
-            str: A response message.
+            message (bytes): joystick_protocol frame received by the BLE client.
         """
-        #print(f'Message: {message}')
-        values = message.split(',')
-        vals = (int(values[0], 16), int(values[1], 16), int(values[2], 16), int(values[3], 16), int(values[4]) % 2, int(values[4]) //2)
-        print(vals)
-        
-        # TODO: clean up this ugliness
-        if vals[1] - 13447 > 400:
+        if self.joystick.decode(message):
+            self.receive_command(self.joystick)
+            
+    def receive_command(self, joystick: JoystickState)-> None:
+        """Move the gripper with the left stick y and the lifter with the right stick y.
+        Args:
+            joystick (JoystickState): joystick state, already decoded, e.g. by ClawRobot.
+        """
+        if joystick.left_y > self.deadband:
             self.gripper.start_open()
-        elif vals[1] - 13447 < -400:
+        elif joystick.left_y < -self.deadband:
             self.gripper.start_close()
         else:
             self.gripper.stop()
             
-        # TODO: clean up this ugliness
-        if vals[3] - 13447 > 400:
+        if joystick.right_y > self.deadband:
             self.lifter.start_lower()
-        elif vals[3] - 13447 < -400:
+        elif joystick.right_y < -self.deadband:
             self.lifter.start_lift()
         else:
             self.lifter.stop()
@@ -10,6 +10,7 @@
 # Separate test classes, one including BLEClient and one without.
 #
 from ble_client import BLEClient
+from joystick_protocol import JoystickState
 import uasyncio as asyncio
 from gripper import Gripper
 from lifter import Lifter
@@ -17,6 +18,7 @@ from time import sleep
 
 class RCClaw:
     gain: float = 30.0
+    deadband: int = 1000  # Stick movement ignored, out of 32767
     
     def __init__(self, gripper_pin: int = 17, lifter_pin: int = 16)-> None:
         self.ble_client = BLEClient(
@@ -24,7 +26,9 @@ class RCClaw:
             receive_message_func=self.receive_message,
             on_connected_func=self.on_connected,
             on_disconnected_func=self.on_disconnected,
-            receive_interval_ms=50) #50
+            receive_interval_ms=50, #50
+            raw=True)
+        self.joystick = JoystickState()
         self.running = False
         self.gripper = Gripper(pin=gripper_pin)
         self.lifter = Lifter(pin=lifter_pin)
@@ -34,24 +38,21 @@ class RCClaw:
         self.lifter.lift()
         sleep(0.5)
        
-    def receive_message(self, message)-> str:
-        #print(f'Message: {message}')
-        values = message.split(',')
-        vals = (int(values[0], 16), int(values[1], 16), int(values[2], 16), int(values[3], 16), int(values[4]) % 2, int(values[4]) //2)
-        #print(vals)
+    def receive_message(self, message: bytes)-> None:
+        joystick: JoystickState = self.joystick
+        if not joystick.decode(message):
+            return
         
-        # TODO: clean up this ugliness
-        if vals[1] - 13447 > 400:
+        if joystick.left_y > self.deadband:
             self.gripper.start_open()
-        elif vals[1] - 13447 < -400:
+        elif joystick.left_y < -self.deadband:
             self.gripper.start_close()
         else:
             self.gripper.stop()
             
-        # TODO: clean up this ugliness
-        if vals[3] - 13447 > 400:
+        if joystick.right_y > self.deadband:
             self.lifter.start_lower()
-        elif vals[3] - 13447 < -400:
+        elif joystick.right_y < -self.deadband:
             self.lifter.start_lift()
         else:
             self.lifter.stop()
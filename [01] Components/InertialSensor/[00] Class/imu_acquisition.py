@@ -0,0 +1,177 @@
+#
+# IMUAcquisition
+#
+# Version: 1.00
+# Date: 2025-07-28
+# Author: Sam Linton
+# Description: Data-ready interrupt driven MPU6050 sampling into a ring buffer
+#
+# The MPU6050 pulses its INT pin each time a new sample is ready. The pin handler
+# only takes ticks_us and schedules the I2C read with it as the argument, so it is
+# safe as a hard IRQ, and each read gets the time of its own edge even if another
+# edge comes before it runs. The scheduled read stores the raw int16 accel and gyro
+# values with the timestamp in preallocated arrays. Only the reader advances head and only drain() advances
+# tail, so producer and consumer never need to disable interrupts. If the buffer is
+# full the new sample is dropped and counted in overruns; if the schedule queue is
+# full the sample is counted in missed.
+#
+# Consumers (heading, odometry, logging) subscribe a callback and are handed every
+# sample in order by drain(), or by the run() task.
+#
+# Pins
+# ----
+# MPU6050 INT - int_pin (any GPIO)
+#
+import micropython
+import uasyncio as asyncio
+from array import array
+from machine import Pin
+from time import ticks_us
+from ustruct import unpack_from
+from imu import MPU6050
+
+
+class IMUAcquisition:
+    SIZE: int = 64  # Samples held in the ring buffer
+    SAMPLE_RATE: int = 100  # Hz
+
+    def __init__(self, imu: MPU6050, int_pin: Pin, size: int = SIZE) -> None:
+        """constructor
+
+        Args:
+            imu (MPU6050): sensor, already set up
+            int_pin (Pin): input pin wired to the MPU6050 INT pin
+            size (int, optional): samples held in the ring buffer. Defaults to SIZE.
+        """
+        self._imu: MPU6050 = imu
+        self._int_pin: Pin = int_pin
+        self._size: int = size
+
+        # Ring buffer: timestamp and ax, ay, az, gx, gy, gz per sample
+        self._ticks: array = array('l', [0] * size)
+        self._raw: array = array('h', [0] * (6 * size))
+        self._head: int = 0  # Samples written, only changed by _read_sample
+        self._tail: int = 0  # Samples consumed, only changed by drain
+        self._buf: bytearray = bytearray(14)
+        self._read_ref = self._read_sample  # Bound once, so the IRQ handler does not allocate
+
+        self._consumers: list = []
+        self._running: bool = False
+
+        self.overruns: int = 0  # Samples dropped because the buffer was full
+        self.missed: int = 0  # Data-ready edges that could not be scheduled
+
+    @property
+    def available(self) -> int:
+        """Number of samples waiting to be drained."""
+        return self._head - self._tail
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def subscribe(self, consumer) -> None:
+        """Add a consumer, called as consumer(t_us, ax, ay, az, gx, gy, gz) with raw values
+        for every sample. Divide by imu.accel_scale and imu.gyro_scale for g and deg/s.
+        """
+        self._consumers.append(consumer)
+
+    def start(self, sample_rate: int = SAMPLE_RATE) -> None:
+        """Set the sample rate and start taking a sample on every data-ready interrupt."""
+        imu: MPU6050 = self._imu
+        if imu.filter_range == 0:  # Gyro would sample at 8kHz
+            imu.filter_range = 1
+        imu.sample_rate = max(0, min(255, round(1000 / sample_rate) - 1))
+
+        self._head = 0
+        self._tail = 0
+        self._running = True
+        self._int_pin.irq(handler=self._on_data_ready, trigger=Pin.IRQ_RISING, hard=True)
+        imu._write(0x12, 0x37, imu.mpu_addr)  # INT active high pulse, cleared on any read, keep passthrough
+        imu._write(0x01, 0x38, imu.mpu_addr)  # DATA_RDY_EN
+        self._read_sample(ticks_us())  # Reading clears any pending interrupt
+
+    def stop(self) -> None:
+        """Stop taking samples. Samples already buffered can still be drained."""
+        self._running = False
+        imu: MPU6050 = self._imu
+        imu._write(0x00, 0x38, imu.mpu_addr)
+        self._int_pin.irq(handler=None)
+
+    def drain(self) -> int:
+        """Hand every waiting sample to the consumers, oldest first.
+
+        Returns:
+            int: number of samples drained
+        """
+        count: int = 0
+        while self._tail != self._head:
+            i: int = self._tail % self._size
+            j: int = 6 * i
+            raw: array = self._raw
+            for consumer in self._consumers:
+                consumer(self._ticks[i], raw[j], raw[j + 1], raw[j + 2], raw[j + 3], raw[j + 4], raw[j + 5])
+            self._tail += 1
+            count += 1
+        return count
+
+    async def run(self, period_ms: int = 10) -> None:
+        """Drain the buffer every period_ms until stopped."""
+        while self._running:
+            self.drain()
+            await asyncio.sleep_ms(period_ms)
+        self.drain()
+
+    def _on_data_ready(self, pin: Pin) -> None:
+        """Pin IRQ handler. No I2C or allocation here."""
+        try:
+            micropython.schedule(self._read_ref, ticks_us())
+        except RuntimeError:
+            self.missed += 1
+
+    def _read_sample(self, t_us: int) -> None:
+        """Read accel, temperature and gyro in one transaction and store accel and gyro,
+        with t_us, the time of the data-ready edge."""
+        imu: MPU6050 = self._imu
+        imu._read(self._buf, 0x3B, imu.mpu_addr)
+        if self._head - self._tail >= self._size:
+            self.overruns += 1
+            return
+        i: int = self._head % self._size
+        j: int = 6 * i
+        self._ticks[i] = t_us
+        self._raw[j], self._raw[j + 1], self._raw[j + 2] = unpack_from('>3h', self._buf, 0)
+        self._raw[j + 3], self._raw[j + 4], self._raw[j + 5] = unpack_from('>3h', self._buf, 8)
+        self._head += 1
+
+    def __str__(self) -> str:
+        return f'IMUAcquisition: {self.available}/{self._size} samples waiting, {self.overruns} overruns, {self.missed} missed'
+
+
+if __name__ == '__main__':
+    from machine import I2C
+    from time import ticks_diff
+
+    i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
+    imu = MPU6050(i2c)
+    acquisition = IMUAcquisition(imu, Pin(2, Pin.IN))
+
+    heading: list[float] = [0.0]
+    last_ticks: list[int] = [0]
+
+    def integrate_heading(t_us: int, ax: int, ay: int, az: int, gx: int, gy: int, gz: int) -> None:
+        if last_ticks[0]:
+            heading[0] += 1.0e-06 * ticks_diff(t_us, last_ticks[0]) * gz / imu.gyro_scale
+        last_ticks[0] = t_us
+
+    acquisition.subscribe(integrate_heading)
+
+    async def main():
+        acquisition.start(sample_rate=200)
+        asyncio.create_task(acquisition.run())
+        for _ in range(10):
+            await asyncio.sleep_ms(500)
+            print(f'heading: {heading[0]:.1f} {acquisition}')
+        acquisition.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+#
+# IMUGroup
+#
+# Version: 1.00
+# Date: 2025-07-30
+# Author: Sam Linton
+# Description: Several MPU6050s on one I2C bus, sampled together
+#
+# An MPU6050 answers at 0x68, or at 0x69 with its AD0 pin high, so two can share a
+# bus, e.g. for redundancy or for body and arm orientation. snapshot() reads each
+# device's accel, temperature and gyro in one burst, back to back, so the samples are
+# as close together in time as the bus allows. ticks(i) gives the time of each read.
+#
+# Pins
+# ----
+# IMU 0 AD0 - GND (0x68)
+# IMU 1 AD0 - 3V3 (0x69)
+#
+from array import array
+from machine import I2C
+from time import ticks_us
+from imu import MPU6050
+
+
+class IMUGroup:
+    ADDRESSES: tuple = (0x68, 0x69)
+
+    def __init__(self, imus: list[MPU6050]) -> None:
+        """constructor
+
+        Args:
+            imus (list[MPU6050]): sensors, already set up
+        """
+        self._imus: list[MPU6050] = imus
+        self._ticks: array = array('l', [0] * len(imus))  # ticks_us of each device's last read
+
+    @classmethod
+    def create(cls, i2c: I2C, addresses: tuple = ADDRESSES) -> 'IMUGroup':
+        """Group of sensors at the given addresses on the bus. No bus scan is needed."""
+        return cls([MPU6050(i2c, device_addr=address) for address in addresses])
+
+    @property
+    def imus(self) -> list[MPU6050]:
+        return self._imus
+
+    def __len__(self) -> int:
+        return len(self._imus)
+
+    def ticks(self, i: int) -> int:
+        """ticks_us when sensor i was last read."""
+        return self._ticks[i]
+
+    def snapshot(self) -> None:
+        """Read every sensor in turn, each in a single burst."""
+        imus: list[MPU6050] = self._imus
+        for i in range(len(imus)):
+            self._ticks[i] = ticks_us()
+            imus[i].snapshot()
+
+    def mean_gyro(self) -> tuple:
+        """Gyro x, y, z averaged over the sensors at the last snapshot, deg/s."""
+        return self._mean([imu.gyro for imu in self._imus])
+
+    def mean_accel(self) -> tuple:
+        """Accel x, y, z averaged over the sensors at the last snapshot, g."""
+        return self._mean([imu.accel for imu in self._imus])
+
+    def gyro_spread(self) -> float:
+        """Largest difference between the sensors on any gyro axis at the last snapshot, deg/s.
+        A large value means one of them is faulty or they are not moving together.
+        """
+        spread: float = 0.0
+        for axis in range(3):
+            values: list[float] = [imu.gyro.cached_xyz[axis] for imu in self._imus]
+            spread = max(spread, max(values) - min(values))
+        return spread
+
+    def _mean(self, vectors: list) -> tuple:
+        x: float = 0.0
+        y: float = 0.0
+        z: float = 0.0
+        for vector in vectors:
+            vx, vy, vz = vector.cached_xyz
+            x += vx
+            y += vy
+            z += vz
+        n: int = len(vectors)
+        return (x / n, y / n, z / n)
+
+    def __str__(self) -> str:
+        return f'IMUGroup: {len(self._imus)} sensors at {[hex(imu.mpu_addr) for imu in self._imus]}'
+
+
+if __name__ == '__main__':
+    from machine import Pin
+    from time import sleep_ms
+
+    i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400_000)
+    imus = IMUGroup.create(i2c)
+    print(imus)
+    for _ in range(20):
+        imus.snapshot()
+        print(f'gyro {imus.mean_gyro()} spread {imus.gyro_spread():.2f} deg/s, read {imus.ticks(1) - imus.ticks(0)} us apart')
+        sleep_ms(100)
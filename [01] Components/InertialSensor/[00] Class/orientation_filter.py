@@ -0,0 +1,250 @@
+#
+# OrientationFilter
+#
+# Version: 1.00
+# Date: 2025-07-29
+# Author: Sam Linton
+# Description: Fixed-rate orientation fusion (Madgwick) of gyro, accel and optional magnetometer
+#
+# The orientation is kept as a quaternion in a preallocated array. Each sample the
+# gyro rate is integrated over the fixed sample period and the accelerometer pulls
+# pitch and roll back towards gravity, with a strength set by beta. The accelerometer
+# cannot see yaw, so without a magnetometer the heading drifts only by the remaining
+# gyro bias. With a magnetometer (anything with read_scaled() returning x, y, z first,
+# mounted with the same axes as the IMU), yaw is pulled towards magnetic north by
+# mag_gain every mag_every samples, using the tilt-compensated field.
+#
+# Angles follow the right hand rule: heading (yaw) increases turning left, as for
+# InertialSensor. heading, pitch and roll are computed once per sample, so reading
+# them is free.
+#
+from array import array
+from math import sqrt, atan2, asin, cos, sin, radians, degrees
+from time import ticks_diff
+
+
+class OrientationFilter:
+    SAMPLE_RATE: int = 200  # Hz
+    BETA: float = 0.05  # Accelerometer correction gain
+    MAG_GAIN: float = 0.02  # Fraction of the yaw error to magnetic north removed per correction
+
+    def __init__(self,
+                 sample_rate: float = SAMPLE_RATE,
+                 beta: float = BETA,
+                 magnetometer = None,
+                 mag_every: int = 4,
+                 mag_gain: float = MAG_GAIN,
+                 accel_scale: float = 16384.0,
+                 gyro_scale: float = 131.0) -> None:
+        """constructor
+
+        Args:
+            sample_rate (float, optional): rate at which samples arrive, Hz. Defaults to SAMPLE_RATE.
+            beta (float, optional): accelerometer correction gain. Defaults to BETA.
+            magnetometer (optional): source of the field for yaw correction, read_scaled() -> (x, y, z, ...). Defaults to None.
+            mag_every (int, optional): samples between magnetometer reads. Defaults to 4.
+            mag_gain (float, optional): yaw correction gain. Defaults to MAG_GAIN.
+            accel_scale (float, optional): raw counts per g, for add_raw_sample. Defaults to 16384.0.
+            gyro_scale (float, optional): raw counts per deg/s, for add_raw_sample. Defaults to 131.0.
+        """
+        self._period: float = 1.0 / sample_rate
+        self._beta: float = beta
+        self._magnetometer = magnetometer
+        self._mag_every: int = max(1, mag_every)
+        self._mag_gain: float = mag_gain
+        self._accel_scale: float = accel_scale
+        self._gyro_scale: float = gyro_scale
+
+        self._q: array = array('f', (1.0, 0.0, 0.0, 0.0))  # w, x, y, z
+        self._gyro_bias: array = array('f', (0.0, 0.0, 0.0))  # deg/s
+        self._last_ticks: int = 0
+        self._count: int = 0
+
+        self._heading: float = 0.0
+        self._pitch: float = 0.0
+        self._roll: float = 0.0
+
+    @property
+    def heading(self) -> float:
+        """Yaw in degrees, 0 to 360."""
+        return self._heading
+
+    @property
+    def pitch(self) -> float:
+        return self._pitch
+
+    @property
+    def roll(self) -> float:
+        return self._roll
+
+    @property
+    def quaternion(self) -> tuple:
+        """Orientation as (w, x, y, z)."""
+        q = self._q
+        return (q[0], q[1], q[2], q[3])
+
+    @property
+    def sample_rate(self) -> float:
+        return 1.0 / self._period
+
+    def set_gyro_bias(self, x: float, y: float, z: float) -> None:
+        """Gyro reading at rest in deg/s, subtracted from every sample."""
+        self._gyro_bias[0] = x
+        self._gyro_bias[1] = y
+        self._gyro_bias[2] = z
+
+    def reset(self, heading: float = 0.0) -> None:
+        """Level orientation at the heading in degrees."""
+        half: float = radians(heading) / 2
+        q = self._q
+        q[0] = cos(half)
+        q[1] = 0.0
+        q[2] = 0.0
+        q[3] = sin(half)
+        self._last_ticks = 0
+        self._update_angles()
+
+    def add_raw_sample(self, t_us: int, ax: int, ay: int, az: int, gx: int, gy: int, gz: int) -> None:
+        """Add a timestamped raw IMU sample, e.g. as a subscriber of IMUAcquisition.
+        Samples are integrated over the fixed period unless the timestamps show
+        that samples were missed, in which case the actual gap is used.
+        """
+        dt: float = self._period
+        if self._last_ticks:
+            gap: float = 1.0e-06 * ticks_diff(t_us, self._last_ticks)
+            if gap > 1.5 * dt:
+                dt = gap
+        self._last_ticks = t_us
+        accel_scale: float = self._accel_scale
+        gyro_scale: float = self._gyro_scale
+        self.update(gx / gyro_scale, gy / gyro_scale, gz / gyro_scale,
+                    ax / accel_scale, ay / accel_scale, az / accel_scale, dt)
+
+    def update(self, gx: float, gy: float, gz: float, ax: float, ay: float, az: float, dt: float = 0.0) -> None:
+        """Add one sample: gyro in deg/s, accel in g.
+
+        Args:
+            dt (float, optional): time since the previous sample, s. Defaults to the sample period.
+        """
+        if dt <= 0.0:
+            dt = self._period
+        bias = self._gyro_bias
+        gx = radians(gx - bias[0])
+        gy = radians(gy - bias[1])
+        gz = radians(gz - bias[2])
+
+        q = self._q
+        q0 = q[0]
+        q1 = q[1]
+        q2 = q[2]
+        q3 = q[3]
+
+        # Rate of change of the quaternion from the gyro
+        q_dot0: float = 0.5 * (-q1 * gx - q2 * gy - q3 * gz)
+        q_dot1: float = 0.5 * (q0 * gx + q2 * gz - q3 * gy)
+        q_dot2: float = 0.5 * (q0 * gy - q1 * gz + q3 * gx)
+        q_dot3: float = 0.5 * (q0 * gz + q1 * gy - q2 * gx)
+
+        # Gradient descent step towards the orientation where gravity reads as measured
+        norm: float = ax * ax + ay * ay + az * az
+        if norm > 0.0:
+            norm = 1.0 / sqrt(norm)
+            ax *= norm
+            ay *= norm
+            az *= norm
+            q0q0: float = q0 * q0
+            q1q1: float = q1 * q1
+            q2q2: float = q2 * q2
+            q3q3: float = q3 * q3
+            s0: float = 4.0 * q0 * q2q2 + 2.0 * q2 * ax + 4.0 * q0 * q1q1 - 2.0 * q1 * ay
+            s1: float = 4.0 * q1 * q3q3 - 2.0 * q3 * ax + 4.0 * q0q0 * q1 - 2.0 * q0 * ay - 4.0 * q1 + 8.0 * q1 * q1q1 + 8.0 * q1 * q2q2 + 4.0 * q1 * az
+            s2: float = 4.0 * q0q0 * q2 + 2.0 * q0 * ax + 4.0 * q2 * q3q3 - 2.0 * q3 * ay - 4.0 * q2 + 8.0 * q2 * q1q1 + 8.0 * q2 * q2q2 + 4.0 * q2 * az
+            s3: float = 4.0 * q1q1 * q3 - 2.0 * q1 * ax + 4.0 * q2q2 * q3 - 2.0 * q2 * ay
+            norm = s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3
+            if norm > 0.0:
+                norm = self._beta / sqrt(norm)
+                q_dot0 -= norm * s0
+                q_dot1 -= norm * s1
+                q_dot2 -= norm * s2
+                q_dot3 -= norm * s3
+
+        q0 += q_dot0 * dt
+        q1 += q_dot1 * dt
+        q2 += q_dot2 * dt
+        q3 += q_dot3 * dt
+        norm = 1.0 / sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+        q[0] = q0 * norm
+        q[1] = q1 * norm
+        q[2] = q2 * norm
+        q[3] = q3 * norm
+
+        self._count += 1
+        if self._magnetometer is not None and self._count >= self._mag_every:
+            self._count = 0
+            field = self._magnetometer.read_scaled()
+            self.correct_yaw(field[0], field[1], field[2])
+        else:
+            self._update_angles()
+
+    def correct_yaw(self, mx: float, my: float, mz: float) -> None:
+        """Turn the orientation about the vertical towards the measured magnetic field
+        (any units, sensor axes), removing mag_gain of the yaw error.
+        """
+        q = self._q
+        q0 = q[0]
+        q1 = q[1]
+        q2 = q[2]
+        q3 = q[3]
+
+        # Horizontal components of the field in the earth frame
+        hx: float = (1.0 - 2.0 * (q2 * q2 + q3 * q3)) * mx + 2.0 * (q1 * q2 - q0 * q3) * my + 2.0 * (q1 * q3 + q0 * q2) * mz
+        hy: float = 2.0 * (q1 * q2 + q0 * q3) * mx + (1.0 - 2.0 * (q1 * q1 + q3 * q3)) * my + 2.0 * (q2 * q3 - q0 * q1) * mz
+        if hx != 0.0 or hy != 0.0:
+            # North should lie along x; rotate about the earth z axis by a fraction of the error
+            half: float = -0.5 * self._mag_gain * atan2(hy, hx)
+            c: float = cos(half)
+            s: float = sin(half)
+            q[0] = c * q0 - s * q3
+            q[1] = c * q1 - s * q2
+            q[2] = c * q2 + s * q1
+            q[3] = c * q3 + s * q0
+        self._update_angles()
+
+    def _update_angles(self) -> None:
+        q = self._q
+        q0 = q[0]
+        q1 = q[1]
+        q2 = q[2]
+        q3 = q[3]
+        heading: float = degrees(atan2(2.0 * (q0 * q3 + q1 * q2), 1.0 - 2.0 * (q2 * q2 + q3 * q3)))
+        self._heading = heading + 360.0 if heading < 0.0 else heading
+        sin_pitch: float = 2.0 * (q0 * q2 - q3 * q1)
+        self._pitch = degrees(asin(max(-1.0, min(1.0, sin_pitch))))
+        self._roll = degrees(atan2(2.0 * (q0 * q1 + q2 * q3), 1.0 - 2.0 * (q1 * q1 + q2 * q2)))
+
+    def __str__(self) -> str:
+        return f'OrientationFilter: heading {self._heading:.1f} pitch {self._pitch:.1f} roll {self._roll:.1f} deg'
+
+
+if __name__ == '__main__':
+    from machine import I2C, Pin
+    import uasyncio as asyncio
+    from imu import MPU6050
+    from imu_acquisition import IMUAcquisition
+
+    i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
+    imu = MPU6050(i2c)
+    orientation = OrientationFilter(sample_rate=200, accel_scale=imu.accel_scale, gyro_scale=imu.gyro_scale)
+
+    acquisition = IMUAcquisition(imu, Pin(2, Pin.IN))
+    acquisition.subscribe(orientation.add_raw_sample)
+
+    async def main():
+        acquisition.start(sample_rate=200)
+        asyncio.create_task(acquisition.run())
+        for _ in range(20):
+            await asyncio.sleep_ms(500)
+            print(orientation)
+        acquisition.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+#
+# imu_acquisition_test
+#
+# Version: 1.00
+# Date: 2025-08-18
+# Author: Sam Linton
+# Description: Checks of IMUAcquisition with a fake pin and a fake I2C. No hardware needed.
+#
+# FakeI2C is an MPU6050 whose accel and gyro registers hold the number of the next
+# sample. FakePin keeps the IRQ handler so the test can fire data-ready edges, and
+# FakeScheduler holds the scheduled reads until the test runs them, as
+# micropython.schedule does when the edges come faster than the reads.
+#
+from time import sleep_us, ticks_us, ticks_diff
+from ustruct import pack_into
+import imu_acquisition
+from imu_acquisition import IMUAcquisition
+from imu import MPU6050
+
+
+class FakeI2C:
+    def __init__(self) -> None:
+        self.registers: bytearray = bytearray(256)
+        self.registers[0x75] = 0x68  # WHO_AM_I
+        self.sample: int = 0  # Number of the next sample
+
+    def readfrom(self, addr: int, n: int) -> bytes:
+        return bytes(n)
+
+    def scan(self) -> list[int]:
+        return [0x68]
+
+    def writeto_mem(self, addr: int, memaddr: int, buf) -> None:
+        self.registers[memaddr:memaddr + len(buf)] = buf
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf) -> None:
+        if memaddr == 0x3B:
+            # ax, ay, az, temperature, gx, gy, gz
+            n: int = self.sample
+            pack_into('>7h', self.registers, 0x3B, n, n + 1, n + 2, 0, -n, -n - 1, -n - 2)
+            self.sample += 1
+        buf[:] = self.registers[memaddr:memaddr + len(buf)]
+
+
+class FakePin:
+    def __init__(self) -> None:
+        self.handler = None
+
+    def irq(self, handler=None, trigger: int = 0, hard: bool = False) -> None:
+        self.handler = handler
+
+    def fire(self) -> None:
+        """Data-ready edge."""
+        self.handler(self)
+
+
+class FakeScheduler:
+    def __init__(self, depth: int = 8) -> None:
+        self.queue: list = []
+        self.depth: int = depth
+
+    def schedule(self, function, arg) -> None:
+        if len(self.queue) >= self.depth:
+            raise RuntimeError('schedule queue full')
+        self.queue.append((function, arg))
+
+    def run(self) -> None:
+        while self.queue:
+            function, arg = self.queue.pop(0)
+            function(arg)
+
+
+def make_acquisition(size: int = IMUAcquisition.SIZE) -> tuple:
+    scheduler = FakeScheduler()
+    imu_acquisition.micropython = scheduler
+    pin = FakePin()
+    acquisition = IMUAcquisition(MPU6050(FakeI2C(), device_addr=0x68), pin, size)
+    acquisition.start()
+    acquisition.drain()  # Sample read by start
+    return acquisition, pin, scheduler
+
+
+def fire(pin: FakePin, num_edges: int) -> list[tuple[int, int]]:
+    """Fire edges far enough apart to tell them by time. Returns (before, after) ticks of each."""
+    times: list[tuple[int, int]] = []
+    for _ in range(num_edges):
+        before: int = ticks_us()
+        pin.fire()
+        times.append((before, ticks_us()))
+        sleep_us(200)
+    return times
+
+
+def drained(acquisition: IMUAcquisition) -> list[tuple]:
+    samples: list[tuple] = []
+    acquisition.subscribe(lambda *sample: samples.append(sample))
+    acquisition.drain()
+    return samples
+
+
+def test_samples_in_order() -> None:
+    """Every edge gives one sample, read in order."""
+    print('Testing samples in order...', end='')
+    acquisition, pin, scheduler = make_acquisition()
+    for _ in range(5):
+        fire(pin, 1)
+        scheduler.run()
+    assert acquisition.available == 5
+    samples = drained(acquisition)
+    assert [sample[1:] for sample in samples] == [(n, n + 1, n + 2, -n, -n - 1, -n - 2) for n in range(1, 6)]
+    assert acquisition.available == 0
+    print('done.')
+
+
+def test_timestamps_of_queued_edges() -> None:
+    """Edges that come before their reads run keep their own times."""
+    print('Testing timestamps of queued edges...', end='')
+    acquisition, pin, scheduler = make_acquisition()
+    times = fire(pin, 4)
+    scheduler.run()
+    samples = drained(acquisition)
+    assert len(samples) == 4
+    for (before, after), sample in zip(times, samples):
+        assert ticks_diff(sample[0], before) >= 0 and ticks_diff(after, sample[0]) >= 0
+    print('done.')
+
+
+def test_overruns_and_missed() -> None:
+    """A full ring drops new samples and a full schedule queue loses edges, both counted."""
+    print('Testing overruns and missed...', end='')
+    acquisition, pin, scheduler = make_acquisition(size=4)
+    fire(pin, 6)
+    scheduler.run()
+    assert acquisition.available == 4 and acquisition.overruns == 2
+    samples = drained(acquisition)
+    assert [sample[1] for sample in samples] == [1, 2, 3, 4]
+
+    fire(pin, scheduler.depth + 2)
+    assert acquisition.missed == 2
+    scheduler.run()
+    assert acquisition.available == 4
+    print('done.')
+
+
+if __name__ == "__main__":
+    test_samples_in_order()
+    test_timestamps_of_queued_edges()
+    test_overruns_and_missed()
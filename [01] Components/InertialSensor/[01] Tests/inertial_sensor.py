@@ -5,15 +5,66 @@
 # TODO: x-value drifts like crazy
 #
 from imu import MPU6050
-from time import sleep, ticks_us
+from orientation_filter import OrientationFilter
+from time import sleep_ms, ticks_us, ticks_ms, ticks_diff
+from math import sqrt
+
+class RunningStats:
+    """Streaming mean and variance of a series of values (Welford's method)
+    """
+
+    def __init__(self)-> None:
+        self.count: int = 0
+        self.mean: float = 0.0
+        self._m2: float = 0.0
+
+    @property
+    def variance(self)-> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self)-> float:
+        return sqrt(self.variance)
+
+    def add(self, value: float)-> None:
+        self.count += 1
+        delta: float = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+
+class CalibrationResult:
+    """Bias and noise of the sensor at rest, vehicle relative
+    """
+
+    def __init__(self, accel: list[RunningStats], gyro: list[RunningStats], sample_rate: float)-> None:
+        self.num_samples: int = gyro[0].count
+        self.sample_rate: float = sample_rate # Hz
+        self.accel_bias: tuple = tuple(stats.mean for stats in accel) # g
+        self.accel_std: tuple = tuple(stats.std for stats in accel) # g
+        self.gyro_bias: tuple = tuple(stats.mean for stats in gyro) # deg/s
+        self.gyro_std: tuple = tuple(stats.std for stats in gyro) # deg/s
+        self.applied: bool = False # Set by calibrate if used as the new bias
+
+    def is_still(self, max_gyro_std: float, max_accel_std: float)-> bool:
+        """True if the noise on every axis is low enough for the sensor to have been at rest
+        """
+        return max(self.gyro_std) <= max_gyro_std and max(self.accel_std) <= max_accel_std
+
+    def __str__(self)-> str:
+        return f'CalibrationResult: {self.num_samples} samples at {self.sample_rate:.0f} Hz, ' + \
+            f'gyro bias {self.gyro_bias} std {self.gyro_std} deg/s, ' + \
+            f'accel bias {self.accel_bias} std {self.accel_std} g'
+
 
 class InertialSensor(MPU6050):
     """Wrapper class for MPU6050 imu that measures heading based on its
     inital value and gyro readings
     """
     
-    def __init__(self, i2c, heading_threshold: float=0.0)-> None:
+    def __init__(self, i2c, heading_threshold: float=0.0, orientation: OrientationFilter | None=None)-> None:
         super().__init__(i2c)
+        self._orientation = orientation # Fed every streamed sample, if given
         self._heading: float = 0.0
         self._heading_drift: float = 0.0 # Rate of drift, deg per sec
         self._winding: int = 0 # For conversion back to total rotation
@@ -24,6 +75,7 @@ class InertialSensor(MPU6050):
         self._a: float = 0.0 # cm /s^2
         self._a_drift: float = 0.0 # cm / s^2
         self._a_threshold = 0.07 # cm / s^2
+        self._stream_rate: int = 0 # Hz, 0 when not streaming
 
         self._update_ticks_us = ticks_us()
         
@@ -46,6 +98,10 @@ class InertialSensor(MPU6050):
     @property
     def a(self)-> float:
         return self._a
+
+    @property
+    def orientation(self)-> OrientationFilter | None:
+        return self._orientation
         
     @property
     def heading(self)-> float:
@@ -55,75 +111,171 @@ class InertialSensor(MPU6050):
     def raw_heading(self)-> float:
         return 360.0 * self._winding + self._heading
     
-    def calibrate(self)-> None:
-        self.calibrate_heading(heading=0.0)
-        self.calibrate_accel()
-        
+    def calibrate(self,
+                  num_samples: int=200,
+                  sample_rate: int=500,
+                  settle_ms: int=50,
+                  max_gyro_std: float=0.5,
+                  max_accel_std: float=0.02,
+                  attempts: int=3)-> CalibrationResult:
+        """Measure the gyro drift and the zero-motion acceleration, and reset heading and x.
+        The measurement is repeated, up to attempts times, until the sensor was still.
+        If it never was, the previous bias, heading and x are kept and the last measurement
+        is returned with applied False.
+
+        Args:
+            num_samples (int, optional): samples to average. Defaults to 200.
+            sample_rate (int, optional): sensor sample rate, Hz. Defaults to 500.
+            settle_ms (int, optional): wait before sampling, e.g. for vibration to die down. Defaults to 50.
+            max_gyro_std (float, optional): most gyro noise on any axis when still, deg/s. Defaults to 0.5.
+            max_accel_std (float, optional): most accel noise on any axis when still, g. Defaults to 0.02.
+            attempts (int, optional): measurements to try. Defaults to 3.
+
+        Raises:
+            ValueError: if attempts is less than 1
+            OSError: if the sensor stops delivering samples (see measure_bias)
+
+        Returns:
+            CalibrationResult: the last measurement; applied is True if it is the new bias
+        """
+        if attempts < 1:
+            raise ValueError(f'attempts must be at least 1, not {attempts}')
+
+        print('Calibrating...', end='')
+        for _ in range(attempts):
+            result: CalibrationResult = self.measure_bias(num_samples, sample_rate, settle_ms)
+            if result.is_still(max_gyro_std, max_accel_std):
+                break
+            print('moving...', end='')
+        else:
+            print('failed, keeping previous bias.')
+            return result
+
+        self._apply_heading_bias(result, heading=0.0)
+        self._apply_accel_bias(result)
+        result.applied = True
+        print(f'complete. Heading drift = {self._heading_drift} Acceleration drift = {self._a_drift} cm/s^2')
+        return result
+
     def calibrate_heading(self, heading: float=0.0)-> None:
         """Measure the drift of the sensor when not in motion so it
         can be compensated for
         """
-        # TODO: probably don't use update here
-
         print('Calibrating Heading...', end='')
-        num_samples: int = 100
-        sample_time: float = 0.01
-        
-        heading_start: float = self._heading
-        time_start: float = self._update_ticks_us
-        for i in range(num_samples):
-            self.update()
-            sleep(sample_time)
-        heading_end: float = self._heading
-        time_end: float = self._update_ticks_us
-            
-        self._heading = heading
-        self._heading_drift = 1.0e06 * (heading_end - heading_start) / (time_end - time_start)
+        self._apply_heading_bias(self.measure_bias(), heading)
         print(f'complete. Heading drift = {self._heading_drift}')
-        
+
     def calibrate_accel(self) -> None:
         """Measure the zero-motion x-acceleration value
         """
         print('Calibrating acceleration...', end='')
-        num_samples: int = 100
-        sample_time: float = 0.01
-        a_min: float = 1.0
-        a_max: float = -1.0
-        
-        accel: float = 0.0 # in g's
-        for _ in range(num_samples):
-            a = self.accel.x
-            a_min = min(a, a_min)
-            a_max = max(a, a_max)
-            accel += self.accel.y
-            sleep(sample_time)
-            
-        self._a_drift = 9.81 * accel / num_samples # in cm/s^2
-        self._x = 0.0
-        self._v = 0.0
-        self._a = 0.0
-        print(f'complete. Acceleration drift = {self._a_drift} cm/s^2 {a_min=} {a_max=}')
-            
+        result: CalibrationResult = self.measure_bias()
+        self._apply_accel_bias(result)
+        print(f'complete. Acceleration drift = {self._a_drift} cm/s^2 std = {result.accel_std}')
+
+    def measure_bias(self, num_samples: int=200, sample_rate: int=500, settle_ms: int=50)-> CalibrationResult:
+        """Collect num_samples consecutive samples through the FIFO at sample_rate and
+        return their mean and standard deviation. Takes settle_ms + num_samples / sample_rate.
+
+        Raises:
+            OSError: if the samples have not arrived within twice the time they should take,
+                e.g. with the sensor disconnected
+        """
+        accel: list[RunningStats] = [RunningStats() for _ in range(3)]
+        gyro: list[RunningStats] = [RunningStats() for _ in range(3)]
+        timeout_ms: int = settle_ms + 2 * num_samples * 1000 // sample_rate
+        t_start: int = ticks_ms()
+
+        sleep_ms(settle_ms)
+        self.start_fifo(sample_rate)
+        count: int = 0
+        try:
+            while count < num_samples:
+                n: int = self.read_fifo()
+                if n == 0:
+                    if ticks_diff(ticks_ms(), t_start) > timeout_ms:
+                        raise OSError(f'IMU sent {count} of {num_samples} samples in {timeout_ms} ms')
+                    sleep_ms(2)
+                    continue
+                for i in range(min(n, num_samples - count)):
+                    self.load_fifo_sample(i)
+                    a_xyz: tuple = self.accel.cached_xyz
+                    g_xyz: tuple = self.gyro.cached_xyz
+                    for axis in range(3):
+                        accel[axis].add(a_xyz[axis])
+                        gyro[axis].add(g_xyz[axis])
+                count += n
+        finally:
+            if self._stream_rate:
+                self.start_fifo(self._stream_rate)
+            else:
+                self.stop_fifo()
+            self._update_ticks_us = ticks_us()
+        return CalibrationResult(accel, gyro, 1.0 / self.fifo_period)
+
     def update(self)-> None:
+        """Read accel and gyro in one snapshot, then update heading and x from it
+        """
+        self.snapshot()
         self.update_heading()
         self.update_x()
         self._update_ticks_us = ticks_us()
         
-    def update_heading(self)-> None:
-        """Update the value of the heading based on the gyro z value
+    def start_streaming(self, sample_rate: int=100)-> None:
+        """Queue samples in the IMU FIFO so update_stream integrates every one of them
+        """
+        self.start_fifo(sample_rate)
+        self._stream_rate = sample_rate
+        self._update_ticks_us = ticks_us()
+
+    def stop_streaming(self)-> None:
+        self.stop_fifo()
+        self._stream_rate = 0
+
+    def update_stream(self)-> int:
+        """Update heading and x from all samples queued since the last call, each
+        at the exact sample period, however long the main loop took. Every sample
+        also goes to the orientation filter, if there is one. Returns the number
+        of samples used.
+        """
+        dt: float = self.fifo_period
+        orientation: OrientationFilter | None = self._orientation
+        num_samples: int = 0
+        while True:
+            n: int = self.read_fifo()
+            if n == 0:
+                break
+            for i in range(n):
+                self.load_fifo_sample(i)
+                self.update_heading(dt)
+                self.update_x(dt)
+                if orientation is not None:
+                    gx, gy, gz = self.gyro.cached_xyz
+                    ax, ay, az = self.accel.cached_xyz
+                    orientation.update(gx, gy, gz, ax, ay, az, dt)
+            num_samples += n
+        self._update_ticks_us = ticks_us()
+        return num_samples
+
+    def update_heading(self, dt: float | None=None)-> None:
+        """Update the value of the heading based on the gyro z value of the last snapshot.
+        dt defaults to the time since the last update.
         """
         # TODO: make this real
-        gyro_z: float = self.gyro.z - self._heading_drift
+        gyro_z: float = self.gyro.cached_xyz[2] - self._heading_drift
         gyro_z = gyro_z if abs(gyro_z) >= self._heading_threshold else 0.0
-        dt: float = max(0.0, 1.0e-06 * (ticks_us() - self._update_ticks_us))
+        if dt is None:
+            dt = max(0.0, 1.0e-06 * (ticks_us() - self._update_ticks_us))
         self._heading += dt * gyro_z
         self._heading, self._winding = self._transform_angle(self._heading, self._winding)
 
-    def update_x(self)-> None:
-        """Update the value of x based on the accelerometer x value
+    def update_x(self, dt: float | None=None)-> None:
+        """Update the value of x based on the accelerometer x value of the last snapshot.
+        dt defaults to the time since the last update.
         """
-        dt: float = max(0.0, 1.0e-06 * (ticks_us() - self._update_ticks_us))
-        a_new = self.accel.y * 9.81 - self._a_drift  # cm/s^2
+        if dt is None:
+            dt = max(0.0, 1.0e-06 * (ticks_us() - self._update_ticks_us))
+        a_new = self.accel.cached_xyz[1] * 9.81 - self._a_drift  # cm/s^2
         a_new = a_new if abs(a_new) > self._a_threshold else 0.0
         
         a_old: float = self._a
@@ -133,6 +285,20 @@ class InertialSensor(MPU6050):
         self._v += 0.5 * (a_old + a_new) * dt # cm/s
         self._x += 0.5 * (v_old + self._v) * dt # cm
         
+    def _apply_heading_bias(self, result: CalibrationResult, heading: float)-> None:
+        self._heading = heading
+        self._winding = 0
+        self._heading_drift = result.gyro_bias[2]
+        if self._orientation is not None:
+            self._orientation.set_gyro_bias(*result.gyro_bias)
+            self._orientation.reset(heading)
+
+    def _apply_accel_bias(self, result: CalibrationResult)-> None:
+        self._a_drift = 9.81 * result.accel_bias[1] # in cm/s^2
+        self._x = 0.0
+        self._v = 0.0
+        self._a = 0.0
+
     def _transform_angle(self, angle: float, winding: int)-> float:
         while angle >= 360.0:
             angle -= 360.0
@@ -0,0 +1,217 @@
+#
+# JoystickSampler
+#
+# Version: 1.00
+# Date: 2025-08-14
+# Author: Sam Linton
+# Description: Background sampling and filtering of joystick axes
+#
+# run() reads every axis at sample_rate (several hundred Hz), independent of how
+# often messages are sent. Each reading goes through a median of 3, which removes
+# single-sample spikes, and then a moving average of the last size values, kept as a
+# running sum over a ring buffer, all in integer arithmetic. axis(i) converts the
+# latest average to a joystick_protocol axis: centred (see calibrate()), with a
+# deadband around the centre so a stick at rest reads exactly 0, and scaled to
+# -AXIS_MAX to AXIS_MAX. Reading an axis never waits for the ADC.
+#
+# JoystickSampler reads the Pico's ADC pins. ADS1115JoystickSampler reads the
+# channels of an ADS1115 on I2C, one conversion per sample, without waiting: each
+# sample reads the conversion started by the previous one and starts the next.
+#
+import uasyncio as asyncio
+from array import array
+from joystick_protocol import AXIS_MAX
+
+
+class JoystickSampler:
+    SAMPLE_RATE: int = 400  # Hz
+    SIZE: int = 4  # Values averaged
+    DEADBAND: int = 1000  # Out of AXIS_MAX
+
+    def __init__(self,
+                 adcs: list,
+                 sample_rate: int = SAMPLE_RATE,
+                 size: int = SIZE,
+                 deadband: int = DEADBAND,
+                 full_scale: int = 65535) -> None:
+        """constructor
+
+        Args:
+            adcs (list): an ADC for each axis, read with read_u16(). Empty for subclasses.
+            sample_rate (int, optional): readings of each ADC per second. Defaults to SAMPLE_RATE.
+            size (int, optional): values in the moving average. Defaults to SIZE.
+            deadband (int, optional): distance from the centre read as 0, out of AXIS_MAX. Defaults to DEADBAND.
+            full_scale (int, optional): reading with the stick at one end. Defaults to 65535.
+        """
+        self._adcs: list = adcs
+        self._period_ms: int = max(1, 1000 // sample_rate)
+        self._size: int = size
+        self.deadband: int = deadband
+        self._half_scale: int = full_scale // 2
+        self._init_channels(len(adcs))
+
+    def _init_channels(self, num_channels: int) -> None:
+        self._num_channels: int = num_channels
+        self._previous: array = array('l', [0] * (2 * num_channels))  # Last two readings
+        self._ring: array = array('l', [0] * (self._size * num_channels))  # Last size medians
+        self._sums: array = array('l', [0] * num_channels)  # Sum of the ring
+        self._heads: array = array('H', [0] * num_channels)
+        self._filled: array = array('B', [0] * num_channels)
+        self._centres: array = array('l', [self._half_scale] * num_channels)
+        self.num_samples: int = 0
+        self._running: bool = False
+
+    @property
+    def num_channels(self) -> int:
+        return self._num_channels
+
+    def value(self, i: int) -> int:
+        """Filtered reading of axis i, in ADC units."""
+        return self._sums[i] // self._size
+
+    def axis(self, i: int) -> int:
+        """Filtered axis i, centred, with the deadband, -AXIS_MAX to AXIS_MAX."""
+        axis: int = (self._sums[i] // self._size - self._centres[i]) * AXIS_MAX // self._half_scale
+        deadband: int = self.deadband
+        if axis > deadband:
+            axis = (axis - deadband) * AXIS_MAX // (AXIS_MAX - deadband)
+        elif axis < -deadband:
+            axis = (axis + deadband) * AXIS_MAX // (AXIS_MAX - deadband)
+        else:
+            return 0
+        return max(-AXIS_MAX, min(AXIS_MAX, axis))
+
+    def calibrate(self) -> None:
+        """Take the current filtered readings as the centres. The sticks must be at rest."""
+        for i in range(self._num_channels):
+            self._centres[i] = self.value(i)
+
+    def set_centres(self, centres) -> None:
+        """Set the centre of each axis, in ADC units, e.g. from an earlier calibrate()."""
+        for i in range(self._num_channels):
+            self._centres[i] = centres[i]
+
+    def sample(self) -> None:
+        """Read every axis once."""
+        adcs: list = self._adcs
+        for i in range(self._num_channels):
+            self._add(i, adcs[i].read_u16())
+        self.num_samples += 1
+
+    async def run(self, calibrate: bool = True) -> None:
+        """Sample every period until stopped.
+
+        Args:
+            calibrate (bool, optional): calibrate once the moving average is full. Defaults to True.
+        """
+        self._running = True
+        count: int = 0
+        while self._running:
+            self.sample()
+            if calibrate:
+                count += 1
+                if count == self._size * self._num_channels:
+                    self.calibrate()
+                    calibrate = False
+            await asyncio.sleep_ms(self._period_ms)
+
+    def stop(self) -> None:
+        self._running = False
+
+    def _add(self, i: int, reading: int) -> None:
+        """Add a reading of axis i: median of the last 3, then into the moving average."""
+        previous: array = self._previous
+        j: int = 2 * i
+        ring: array = self._ring
+        size: int = self._size
+        if not self._filled[i]:
+            previous[j] = reading
+            previous[j + 1] = reading
+            for k in range(i * size, (i + 1) * size):
+                ring[k] = reading
+            self._sums[i] = reading * size
+            self._filled[i] = 1
+            return
+
+        a: int = previous[j]
+        b: int = previous[j + 1]
+        previous[j] = b
+        previous[j + 1] = reading
+        median: int = max(min(a, b), min(max(a, b), reading))
+
+        k = i * size + self._heads[i]
+        self._sums[i] += median - ring[k]
+        ring[k] = median
+        self._heads[i] = (self._heads[i] + 1) % size
+
+    def __str__(self) -> str:
+        axes: str = ', '.join(str(self.axis(i)) for i in range(self._num_channels))
+        return f'{type(self).__name__}: axes ({axes}), {self.num_samples} samples'
+
+
+class ADS1115JoystickSampler(JoystickSampler):
+    SAMPLE_RATE: int = 800  # Conversions per second, shared by the channels
+
+    def __init__(self,
+                 adc,
+                 channels: tuple = (0, 1, 2, 3),
+                 rate: int = 4,
+                 vdd: float = 3.3,
+                 sample_rate: int = SAMPLE_RATE,
+                 size: int = JoystickSampler.SIZE,
+                 deadband: int = JoystickSampler.DEADBAND) -> None:
+        """constructor
+
+        Args:
+            adc (ADS1115): converter, with the sticks on single-ended channels
+            channels (tuple, optional): channel of each axis. Defaults to (0, 1, 2, 3).
+            rate (int, optional): ADS1115 rate index; the conversion must finish within a sample
+                period (4, 1600 per second, does up to 1000 Hz). Defaults to 4.
+            vdd (float, optional): supply voltage of the sticks. Defaults to 3.3.
+            sample_rate (int, optional): conversions per second, shared by the channels. Defaults to SAMPLE_RATE.
+            size (int, optional): values in the moving average. Defaults to SIZE.
+            deadband (int, optional): distance from the centre read as 0, out of AXIS_MAX. Defaults to DEADBAND.
+        """
+        full_scale: int = round(32768 * vdd / adc.raw_to_v(32768))
+        super().__init__([], sample_rate, size, deadband, full_scale)
+        self._init_channels(len(channels))
+        self._adc = adc
+        self._channels: tuple = channels
+        self._rate: int = rate
+        self._channel: int = 0  # Index of the channel being converted
+        self._started: bool = False
+
+    def sample(self) -> None:
+        """Read the conversion started by the previous sample and start the next channel."""
+        adc = self._adc
+        channel: int = self._channel
+        next_channel: int = (channel + 1) % self._num_channels
+        adc.set_conv(self._rate, self._channels[next_channel])
+        reading: int = adc.read_rev()
+        if self._started:
+            self._add(channel, max(0, reading))
+            self.num_samples += 1
+        else:
+            self._started = True  # There was no conversion to read
+        self._channel = next_channel
+
+
+if __name__ == '__main__':
+    from machine import ADC
+    from time import ticks_us, ticks_diff
+
+    sampler = JoystickSampler([ADC(26), ADC(27), ADC(28)])
+
+    t_start = ticks_us()
+    for _ in range(100):
+        sampler.sample()
+    print(f'Sample: {ticks_diff(ticks_us(), t_start) // 100} us')
+
+    async def main():
+        asyncio.create_task(sampler.run())
+        for _ in range(20):
+            await asyncio.sleep_ms(250)
+            print(sampler)
+        sampler.stop()
+
+    asyncio.run(main())
@@ -1,32 +1,33 @@
 import machine
 import math
+from pulse_converter import PulseConverter
 
 class Servo:
-    def __init__(self,pin_id,min_us=544.0,max_us=2400.0,min_deg=0.0,max_deg=180.0,freq=50):
+    def __init__(self,pin_id,min_us=544.0,max_us=2400.0,min_deg=0.0,max_deg=180.0,freq=50,lookup_table=False):
         self.pwm = machine.PWM(machine.Pin(pin_id))
         self.pwm.freq(freq)
-        self.current_us = 0.0
-        self._slope = (min_us-max_us)/(math.radians(min_deg)-math.radians(max_deg))
-        self._offset = min_us
+        self.current_ns = 0
+        self._converter = PulseConverter(min_us*1000.0,(max_us-min_us)*1000.0/(max_deg-min_deg),min_deg,max_deg,lookup_table)
         
     def write(self,deg):
-        self.write_rad(math.radians(deg))
+        self.current_ns=self._converter.to_output(deg)
+        self.pwm.duty_ns(self.current_ns)
 
     def read(self):
-        return math.degrees(self.read_rad())
+        return self._converter.to_angle(self.current_ns)
         
     def write_rad(self,rad):
-        self.write_us(rad*self._slope+self._offset)
+        self.write(math.degrees(rad))
     
     def read_rad(self):
-        return (self.current_us-self._offset)/self._slope
+        return math.radians(self.read())
         
     def write_us(self,us):
-        self.current_us=us
-        self.pwm.duty_ns(int(self.current_us*1000.0))
+        self.current_ns=int(us*1000.0)
+        self.pwm.duty_ns(self.current_ns)
     
     def read_us(self):
-        return self.current_us
+        return self.current_ns/1000.0
 
     def off(self):
         self.pwm.duty_ns(0)
@@ -5,10 +5,10 @@
 # Date: 2025-05-31
 # Author: Sam Linton
 #
-import math
 from machine import Pin, PWM
 from time import sleep
 import uasyncio as asyncio
+from pulse_converter import PulseConverter
 
 class ServoBase:
     """This serves as a base class for servo control. The goals are to:
@@ -30,7 +30,8 @@ class ServoBase:
                  max_us: float = 2400.0,
                  min_deg: float = 0.0,
                  max_deg: float = 180.0,
-                 freq: int = 50
+                 freq: int = 50,
+                 lookup_table: bool = False
                  ) -> None:
         """Set up a servo on the given pin with the specified angles and parameters.
 
@@ -43,12 +44,15 @@ class ServoBase:
             min_deg (float, optional): Minimum angle of the servo (deg). Defaults to 0.0.
             max_deg (float, optional): Maximum angle of the servo (deg). Defaults to 180.0.
             freq (int, optional): PWM frequency, Hz. Defaults to 50.
+            lookup_table (bool, optional): Tabulate pulse widths at 0.1 deg steps. Defaults to False.
         """
         self.pwm = PWM(Pin(pin))
         self.pwm.freq(freq)
-        self.current_us = 0.0
-        self._slope = (min_us-max_us)/(math.radians(min_deg)-math.radians(max_deg))
-        self._offset = min_us
+        self.current_ns = 0
+
+        # Pulse width in ns for the angle, in integer math
+        ns_per_deg: float = 1000.0 * (max_us - min_us) / (max_deg - min_deg)
+        self._converter = PulseConverter(1000.0 * min_us, ns_per_deg, angle_start, angle_end, lookup_table)
         self.angle_start = angle_start
         self.angle_end = angle_end
         self.sign = 1 if angle_end > angle_start else -1
@@ -61,8 +65,8 @@ class ServoBase:
         Args:
             deg (float): angle to move to (deg)
         """
-        self.current_us = math.radians(deg) * self._slope + self._offset
-        self.pwm.duty_ns(int(self.current_us*1000.0))
+        self.current_ns = self._converter.to_output(deg)
+        self.pwm.duty_ns(self.current_ns)
 
     def read(self) -> float:
         """Return the current angle (deg) of the servo
@@ -70,7 +74,7 @@ class ServoBase:
         Returns:
             float: current angle (deg)
         """
-        return math.degrees((self.current_us - self._offset)/self._slope)
+        return self._converter.to_angle(self.current_ns)
     
     def off(self) -> None:
         """Turn off the servo
@@ -10,7 +10,6 @@
 #       and this class just uses that to set the angle. That way, PCA9685 can do its own
 #       reset and set FREQuency
 #
-import ustruct
 from time import sleep
 # from typing import override
 from machine import I2C
@@ -30,19 +29,40 @@ class I2CServoMotor(ServoMotor):
                  angle_start: float = 0.0,
                  angle_end: float = 180.0,
                  angle_home: float = 90.0,
+                 lookup_table: bool = False,
                  ) -> None:
         super().__init__(name, pin, raw_angle_0, sign, angle_start, angle_end, angle_home)
 
-        self._i2c: I2C = servo_controller.i2c
+        self._servo_controller: ServoController = servo_controller
+
+        # Duty counts for the pulse range, computed once
+        t_period_us: int = int(1_000_000 / ServoMotor.FREQ) # period in us
+        min_duty: int = self._us2duty(ServoMotor.MIN_US, t_period_us)
+        max_duty: int = self._us2duty(ServoMotor.MAX_US, t_period_us)
+        self._converter = self._create_converter(min_duty, (max_duty - min_duty) / ServoMotor.MAX_ANGLE_DEG, lookup_table)
+
+    @property
+    def servo_controller(self) -> ServoController:
+        return self._servo_controller
+
+    # @override
+    @property
+    def counts_per_deg(self) -> float:
+        """Duty counts (of 4096) per degree."""
+        return abs(self._converter.out_per_deg)
+
+    # @override
+    @property
+    def refresh_hz(self) -> float:
+        return self._servo_controller.freq
 
     # @override
     def _set_raw_angle(self, raw_angle: float) -> None:
-        duty = self._raw_angle_to_duty(raw_angle)
-        address = 0x06 + 4 * self._pin
-        
-        # Create data to write to I2C
-        data = ustruct.pack('<HH', 0, duty) 
-        self._i2c.writeto_mem(I2CServoMotor.ADDRESS, address,  data) 
+        self._write_angle(self._angle_from_raw_angle(raw_angle))
+
+    # @override
+    def _write_angle(self, angle: float) -> None:
+        self._servo_controller.set_duty(self._pin, self._converter.to_output(angle))
 
     # @override
     def _sleep(self, seconds: float) -> None:
@@ -51,22 +71,7 @@ class I2CServoMotor(ServoMotor):
         
     # @override
     def off(self) -> None:
-        address = 0x06 + 4 * self._pin
-        
-        # Create data to write to I2C
-        data = ustruct.pack('<HH', 0, 0) # type: ignore
-        self._i2c.writeto_mem(I2CServoMotor.ADDRESS, address,  data)
-
-    # TODO: how does this compare to the PWM case?
-    def _raw_angle_to_duty(self, raw_angle: float) -> int:
-        """Convert raw angle to duty cycle."""
-        t_period_us: int = int(1_000_000 / ServoMotor.FREQ) # period in us
-        min_duty: float = self._us2duty(ServoMotor.MIN_US, t_period_us)
-        max_duty: float = self._us2duty(ServoMotor.MAX_US, t_period_us)
-
-        slope: float = (max_duty - min_duty) / ServoMotor.MAX_ANGLE_DEG
-        
-        return int(min_duty + slope * raw_angle)
+        self._servo_controller.off(self._pin)
 
     def _us2duty(self, us: float, t_period_us: float) -> int:
         """Convert microseconds to duty cycle."""
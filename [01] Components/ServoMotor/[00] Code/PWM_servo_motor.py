@@ -14,6 +14,8 @@ from servo_motor import ServoMotor
 
 
 class PWMServoMotor(ServoMotor):
+    PWM_COUNTS: int = 65536 # Duty resolution of the RP2040 PWM (16 bit)
+
     def __init__(self, 
                  name: str = '',
                  pin: int = 16,
@@ -22,11 +24,23 @@ class PWMServoMotor(ServoMotor):
                  angle_start: float = 0.0,
                  angle_end: float = 180.0,
                  angle_home: float = 90.0,
+                 lookup_table: bool = False,
                  ) -> None:
         super().__init__(name, pin, raw_angle_0, sign, angle_start, angle_end, angle_home)
         self._pwm: PWM  = PWM(Pin(pin))
         self._pwm.freq(ServoMotor.FREQ) 
+
+        # Pulse width in ns for the logical angle
+        ns_per_deg: float = 1000.0 * (ServoMotor.MAX_US - ServoMotor.MIN_US) / ServoMotor.MAX_ANGLE_DEG
+        self._converter = self._create_converter(1000.0 * ServoMotor.MIN_US, ns_per_deg, lookup_table)
     
+    # @override
+    @property
+    def counts_per_deg(self) -> float:
+        """PWM counts per degree; one count is a 65536th of the period."""
+        ns_per_count: float = 1_000_000_000 / ServoMotor.FREQ / PWMServoMotor.PWM_COUNTS
+        return abs(self._converter.out_per_deg) / ns_per_count
+
     # @override
     def off(self) -> None:
         """Turn off the servo by setting duty cycle to 0."""
@@ -35,8 +49,12 @@ class PWMServoMotor(ServoMotor):
     # @override
     def _set_raw_angle(self, raw_angle: float) -> None:
         """Write the raw angle to the servo."""
-        us = ServoMotor.MIN_US + (raw_angle / 180.0) * (ServoMotor.MAX_US - ServoMotor.MIN_US)
-        self._pwm.duty_ns(int(us * 1000.0))
+        self._write_angle(self._angle_from_raw_angle(raw_angle))
+
+    # @override
+    def _write_angle(self, angle: float) -> None:
+        """Write the logical angle to the servo."""
+        self._pwm.duty_ns(self._converter.to_output(angle))
 
     # @override
     def _sleep(self, seconds: float) -> None:
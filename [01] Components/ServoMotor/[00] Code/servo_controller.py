@@ -1,5 +1,5 @@
 #
-# ServoController 
+# ServoController
 #
 # Version: 1.00
 # Date: 2025-07-03
@@ -10,9 +10,18 @@
 # raw = sign * angle + raw_angle_0
 # angle = sign * (raw - raw_angle_0)
 #
+# The controller keeps a shadow image of the LED0..LED15 registers. Duty values
+# are normally written straight to the device, but between begin_frame() and
+# commit() they are only staged in the shadow image. commit() then sends every
+# channel from the first to the last changed one in a single auto-increment burst.
+#
+# A duty value equal to the one already in the shadow image is not sent again. The
+# image is seeded from the device, so it always matches what the PCA9685 outputs.
+# writes_issued and writes_suppressed count the I2C transactions sent and avoided.
 #
 from machine import I2C
 from time import sleep_us
+import ustruct
 
 
 class ServoController:
@@ -20,21 +29,49 @@ class ServoController:
     MIN_US: float = 544.0  # Minimum pulse width in microseconds
     MAX_US: float = 2400.0  # Maximum pulse width in microseconds
     FREQ: int = 50  # PWM frequency in Hz
+    NUM_CHANNELS: int = 16
+    LED0: int = 0x06  # First LEDn_ON_L register
 
-    def __init__(self, i2c: I2C) -> None:
+    def __init__(self, i2c: I2C, address: int = ADDRESS, freq: int = FREQ) -> None:
         """Initialize the servo controller with the given I2C interface."""
         self._i2c = i2c
+        self._address: int = address
+        self._freq: int = freq
+
+        # Shadow image of LEDn_ON_L, LEDn_ON_H, LEDn_OFF_L, LEDn_OFF_H for all channels
+        self._frame: bytearray = bytearray(4 * ServoController.NUM_CHANNELS)
+        self._frame_mv: memoryview = memoryview(self._frame)
+        self._staging: bool = False
+        self._first_dirty: int = ServoController.NUM_CHANNELS
+        self._last_dirty: int = -1
+        self._frame_updates: int = 0 # set_duty calls since begin_frame
+
+        # Bus usage
+        self.writes_issued: int = 0
+        self.writes_suppressed: int = 0
+
         self.reset()
-        self.set_freq(ServoController.FREQ)
+        self.set_freq(freq)
+        self.read_frame()
 
     @property
     def i2c(self) -> I2C:
         return self._i2c
 
+    @property
+    def address(self) -> int:
+        return self._address
+
+    @property
+    def freq(self) -> int:
+        """PWM frequency in Hz, which is also how often a new duty value takes effect."""
+        return self._freq
+
     def reset(self) -> None:
         self._write(0x00, 0x00) # Mode1
 
     def set_freq(self, freq: int) -> None:
+        self._freq = freq
         prescale: int = int(25000000.0 / 4096.0 / freq + 0.5)
         old_mode: int = self._read(0x00) # Mode 1
         self._write(0x00, (old_mode & 0x7F) | 0x10) # Mode 1, sleep
@@ -43,16 +80,106 @@ class ServoController:
         sleep_us(5)
         self._write(0x00, old_mode | 0xa1) # Mode 1, autoincrement on
 
+    def read_frame(self) -> None:
+        """Read all LEDn registers from the device into the shadow image in one burst."""
+        self._i2c.readfrom_mem_into(self._address, ServoController.LED0, self._frame) # type: ignore
+        self._first_dirty = ServoController.NUM_CHANNELS
+        self._last_dirty = -1
+
+    def get_duty(self, channel: int) -> int:
+        """Duty value (OFF count) for the channel, as held in the shadow image."""
+        return ustruct.unpack_from('<H', self._frame, 4 * channel + 2)[0]
+
+    def set_duty(self, channel: int, duty: int) -> None:
+        """Set the duty value (OFF count, 0-4095) of a channel. The pulse always starts at count 0.
+        Inside a frame the value is only staged; otherwise it is written immediately.
+        Nothing is sent if the channel already has this value.
+        """
+        offset: int = 4 * channel
+        frame: bytearray = self._frame
+        if self._staging:
+            self._frame_updates += 1
+        if frame[offset] == 0 and frame[offset + 1] == 0 and frame[offset + 2] == duty & 0xFF and frame[offset + 3] == duty >> 8:
+            if not self._staging:
+                self.writes_suppressed += 1
+            return
+
+        ustruct.pack_into('<HH', frame, offset, 0, duty)
+        if self._staging:
+            if channel < self._first_dirty:
+                self._first_dirty = channel
+            if channel > self._last_dirty:
+                self._last_dirty = channel
+        else:
+            self._i2c.writeto_mem(self._address, ServoController.LED0 + offset, self._frame_mv[offset:offset + 4]) # type: ignore
+            self.writes_issued += 1
+
+    def write_channels(self, channel: int, data: memoryview) -> None:
+        """Send a prepared block of LEDn registers starting at the channel in one burst
+        and copy it into the shadow image. The block holds 4 bytes per channel.
+        """
+        start: int = 4 * channel
+        self._frame_mv[start:start + len(data)] = data
+        self._i2c.writeto_mem(self._address, ServoController.LED0 + start, data) # type: ignore
+        self.writes_issued += 1
+
+    def read_channels(self, channel: int, data: memoryview) -> None:
+        """Copy the shadow image of the LEDn registers starting at the channel into a block
+        of 4 bytes per channel. Nothing is read from the device.
+        """
+        start: int = 4 * channel
+        data[:] = self._frame_mv[start:start + len(data)]
+
+    def off(self, channel: int) -> None:
+        """Stop sending pulses on the channel."""
+        self.set_duty(channel, 0)
+
+    def begin_frame(self) -> None:
+        """Start staging duty values. Nothing is sent until commit()."""
+        self._staging = True
+        self._frame_updates = 0
+
+    def commit(self) -> None:
+        """Send all staged channels in a single auto-increment burst and end the frame.
+        If no channel changed, nothing is sent.
+        """
+        self._staging = False
+        if self._last_dirty < 0:
+            if self._frame_updates > 0:
+                self.writes_suppressed += 1
+            return
+        start: int = 4 * self._first_dirty
+        end: int = 4 * (self._last_dirty + 1)
+        self._i2c.writeto_mem(self._address, ServoController.LED0 + start, self._frame_mv[start:end]) # type: ignore
+        self.writes_issued += 1
+        self._first_dirty = ServoController.NUM_CHANNELS
+        self._last_dirty = -1
+
+    def reset_counters(self) -> None:
+        """Zero writes_issued and writes_suppressed."""
+        self.writes_issued = 0
+        self.writes_suppressed = 0
+
     def _write(self, address: int, value: int) -> None:
-        self._i2c.writeto_mem(ServoController.ADDRESS, address, bytearray([value])) # type: ignore
+        self._i2c.writeto_mem(self._address, address, bytearray([value])) # type: ignore
 
     def _read(self, address: int) -> int:
-        return self._i2c.readfrom_mem(ServoController.ADDRESS, address, 1)[0] # type: ignore
-    
-   
+        return self._i2c.readfrom_mem(self._address, address, 1)[0] # type: ignore
+
+
 if __name__ == "__main__":
     from machine import Pin
-    
+
     i2c = I2C(id=1, sda=Pin(14), scl=Pin(15))
     servo_controller = ServoController(i2c = i2c)
 
+    # Stage a few channels and send them together
+    servo_controller.begin_frame()
+    for channel in range(1, 4):
+        servo_controller.set_duty(channel, 307)
+    servo_controller.commit()
+
+    # Repeating the same values costs nothing on the bus
+    servo_controller.set_duty(1, 307)
+    print(f'Writes issued: {servo_controller.writes_issued}, suppressed: {servo_controller.writes_suppressed}')
+
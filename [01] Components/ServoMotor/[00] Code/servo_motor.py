@@ -15,6 +15,7 @@
 #
 
 import uasyncio as asyncio
+from pulse_converter import PulseConverter
 
 class ServoMotor:
     STOPPED: str = 'stopped'
@@ -78,13 +79,27 @@ class ServoMotor:
     @property
     def angle_home(self) -> float:
         return self._angle_home
+
+    @property
+    def servo_controller(self):
+        """Controller that can batch writes for this servo, or None if it is written directly."""
+        return None
+
+    @property
+    def counts_per_deg(self) -> float:
+        """Resolution of the output: hardware counts per degree of logical angle, 0.0 if unknown."""
+        return 0.0
+
+    @property
+    def refresh_hz(self) -> float:
+        """How often the servo picks up a new pulse width."""
+        return ServoMotor.FREQ
     
     def set_angle(self, angle: float) -> None:
         """Write logical angle to the servo."""
-        raw_angle = self._raw_angle_from_angle(angle)
         if not self.angle_in_range(angle):
             raise ValueError(f'Angle {angle} is out of range ({self._angle_start}, {self._angle_end})')
-        self._set_raw_angle(raw_angle)
+        self._write_angle(angle)
         self._angle = angle
         self._initialized = True
         print(f'Setting {self._name} to {self._angle}')
@@ -154,6 +169,25 @@ class ServoMotor:
         """Write the servo angle to the hardware."""
         raise NotImplementedError("This method should be overridden in subclasses.")
 
+    def _write_angle(self, angle: float) -> None:
+        """Write the logical angle to the hardware. Subclasses with a converter go straight from the logical angle."""
+        self._set_raw_angle(self._raw_angle_from_angle(angle))
+
+    def _create_converter(self, out_at_raw_0: float, out_per_raw_deg: float, lookup_table: bool = False) -> PulseConverter:
+        """Integer converter from logical angle to output, with raw_angle_0 and sign folded in.
+
+        Args:
+            out_at_raw_0 (float): output at a raw angle of 0
+            out_per_raw_deg (float): change in output per degree of raw angle
+            lookup_table (bool, optional): tabulate the angle range at 0.1 deg. Defaults to False.
+        """
+        return PulseConverter(
+            out_at_raw_0 + out_per_raw_deg * self._raw_angle_0,
+            self._sign * out_per_raw_deg,
+            self._angle_start,
+            self._angle_end,
+            lookup_table)
+
     def _sleep(self, seconds: float) -> None:
         raise NotImplementedError("Implement in subclass to sleep for a given number of seconds.")
     
@@ -18,7 +18,7 @@
 from servo_motor import ServoMotor
 from movement import Movement
 from position import Position
-from time import sleep
+from trajectory import Trajectory, MoveStats
 import math
 
 
@@ -27,10 +27,24 @@ class ServoSet:
         self._name = name
         self._servos = servos
 
+        # Controllers shared by the servos, used to send each step as one frame
+        self._controllers = []
+        for servo in servos:
+            controller = servo.servo_controller
+            if controller is not None and controller not in self._controllers:
+                self._controllers.append(controller)
+
+        self._move_stats: MoveStats = MoveStats() # Timing of the last move
+
     @property
     def name(self) -> str:
         return self._name
 
+    @property
+    def move_stats(self) -> MoveStats:
+        """Timing of the last move: lateness and dropped frames."""
+        return self._move_stats
+
     def get_home_position(self) -> Position:
         """Get the home position of the servo set."""
         angles: list[float] = [servo.angle_home for servo in self._servos]
@@ -46,43 +60,67 @@ class ServoSet:
         angles: list[float] = [servo.angle_end for servo in self._servos]
         return Position(angles=angles, name=f"{self._name} End Position")
 
-    # Make this async, or just a loop?
-    def move_to_position(self, position: Position, time: float = 0.0, num_steps: int = 10) -> None:
+    @property
+    def servos(self) -> list[ServoMotor]:
+        return self._servos
 
-        # Check for number of servos and position angles match
-        if len(position.angles) != len(self._servos):
-            raise ValueError("Position and servo count mismatch")
-        
-        # Check if all angles are in range for the servos
-        if  not all(servo.angle_in_range(angle) for servo, angle in zip(self._servos, position.angles)):
-            raise ValueError("Position angles out of range for servos")
+    def move_to_position(self, position: Position, time: float = 0.0, num_steps: int | None = 10) -> MoveStats:
+        """Move to the position in the given time, blocking until the move is done.
+
+        Args:
+            position (Position): target angles, one for each servo
+            time (float, optional): duration of the move in seconds. Defaults to 0.0 (immediate).
+            num_steps (int | None, optional): number of frames to write, None to plan them. Defaults to 10.
+
+        Returns:
+            MoveStats: timing of the move
+        """
+        self._check_position(position)
+        if num_steps is None:
+            num_steps = self.plan_num_steps(position, time)
         
-        # If no time or steps, set angles immediately
-        if num_steps <= 1 or time <= 0.0:
-            for i, servo in enumerate(self._servos):
-                servo.set_angle(position[i])
-            return
+        # If no time, set angles immediately. A single step still takes the time, so a
+        # repeated position holds it.
+        if time <= 0.0:
+            self.set_angles(position.angles)
+            self._move_stats = MoveStats()
+            return self._move_stats
         
-        # Get angle increments for each servo
-        angle_inc: list[float] = []
-        for i, servo in enumerate(self._servos):
-            angle_inc.append((position[i] - servo.angle)/num_steps)
-
-        # Loop through the number of steps
-        for _ in range(num_steps):
-            # Update each servo angle
-            for i, servo in enumerate(self._servos):
-                new_angle = servo.angle + angle_inc[i]
-                servo.set_angle(new_angle)
-            print(f"Moving to position: {[servo.angle for servo in self._servos]} (step {_ + 1}/{num_steps})")
-            sleep(time / num_steps)
+        # Interpolate from the current angles, on a timeline that absorbs the I2C write time
+        self._move_stats = MoveStats()
+        Trajectory(self._interpolator(position)).run(time, num_steps, self._move_stats)
+        return self._move_stats
+
+    async def async_move_to_position(self, position: Position, time: float = 0.0, num_steps: int | None = 10) -> MoveStats:
+        """Move to the position in the given time, yielding to other tasks between frames.
+        If the task running the move is cancelled, the servos stay at the last frame written
+        and move_stats holds the timing up to that point.
+
+        Args:
+            position (Position): target angles, one for each servo
+            time (float, optional): duration of the move in seconds. Defaults to 0.0 (immediate).
+            num_steps (int | None, optional): number of frames to write, None to plan them. Defaults to 10.
+
+        Returns:
+            MoveStats: timing of the move
+        """
+        self._check_position(position)
+        if num_steps is None:
+            num_steps = self.plan_num_steps(position, time)
+        self._move_stats = MoveStats()
+        await Trajectory(self._interpolator(position)).async_run(time, num_steps, self._move_stats)
+        return self._move_stats
             
     def get_angles(self) -> list[float]:
         return [servo.angle for servo in self._servos]
         
     def set_angles(self, angles: list[float]) -> None:
-        for i, angle in enumerate(angles):
-            self._servos[i].set_angle(angle)
+        self._begin_frame()
+        try:
+            for i, angle in enumerate(angles):
+                self._servos[i].set_angle(angle)
+        finally:
+            self._commit_frame()
 
     # For debugging
     def get_raw_angles(self) -> list[float]:
@@ -90,13 +128,91 @@ class ServoSet:
         return [servo.raw_angle for servo in self._servos]
             
     def home(self) -> None:
-        for servo in self._servos:
-            servo.home()
+        self._begin_frame()
+        try:
+            for servo in self._servos:
+                servo.home()
+        finally:
+            self._commit_frame()
             
     def execute_movement(self, movement: Movement) -> None:
         for n in range(movement.num_positions):
             time, position = movement[n]
-            self.move_to_position(position, time=time, num_steps=100)
+            self.move_to_position(position, time=time, num_steps=None)
+
+    async def async_execute_movement(self, movement: Movement) -> None:
+        for n in range(movement.num_positions):
+            time, position = movement[n]
+            await self.async_move_to_position(position, time=time, num_steps=None)
+
+    def plan_num_steps(self, position: Position, time: float) -> int:
+        """Number of frames worth sending for a move from the current angles to the position.
+
+        There is no point in a frame that changes no servo's output, so the joint that
+        moves the most output counts sets the number of steps. There is also no point in
+        sending frames faster than the servos pick them up, so the refresh rate caps it.
+
+        Args:
+            position (Position): target angles, one for each servo
+            time (float): duration of the move in seconds
+
+        Returns:
+            int: number of steps, at least 1
+        """
+        if time <= 0.0:
+            return 1
+
+        max_counts: float = 0.0
+        for servo, angle in zip(self._servos, position.angles):
+            counts_per_deg: float = servo.counts_per_deg
+            if counts_per_deg <= 0.0:
+                counts_per_deg = 1.0 # One step per degree
+            max_counts = max(max_counts, abs(angle - servo.angle) * counts_per_deg)
+        refresh_hz: float = min(servo.refresh_hz for servo in self._servos)
+
+        max_steps: int = int(time * refresh_hz)
+        return max(1, min(int(max_counts), max_steps))
+
+    def _check_position(self, position: Position) -> None:
+        # Check for number of servos and position angles match
+        if len(position.angles) != len(self._servos):
+            raise ValueError("Position and servo count mismatch")
+        
+        # Check if all angles are in range for the servos
+        if  not all(servo.angle_in_range(angle) for servo, angle in zip(self._servos, position.angles)):
+            raise ValueError("Position angles out of range for servos")
+
+    def _interpolator(self, position: Position):
+        """Frame writer for a trajectory from the current angles to the position."""
+        start_angles: list[float] = self.get_angles()
+        end_angles: list[float] = position.angles
+
+        def write_frame(t_norm: float) -> None:
+            self._write_interpolated(start_angles, end_angles, t_norm)
+
+        return write_frame
+
+    def _write_interpolated(self, start_angles: list[float], end_angles: list[float], t_norm: float) -> None:
+        """Write the angles at normalized time t_norm between the start and end angles as one frame."""
+        self._begin_frame()
+        try:
+            for i, servo in enumerate(self._servos):
+                if t_norm >= 1.0:
+                    servo.set_angle(end_angles[i]) # Exact end, so range checks at the limits pass
+                else:
+                    servo.set_angle(start_angles[i] + t_norm * (end_angles[i] - start_angles[i]))
+        finally:
+            self._commit_frame()
+
+    def _begin_frame(self) -> None:
+        """Stage writes to I2C servos until _commit_frame is called."""
+        for controller in self._controllers:
+            controller.begin_frame()
+
+    def _commit_frame(self) -> None:
+        """Send the staged writes, one burst per controller."""
+        for controller in self._controllers:
+            controller.commit()
 
     def _get_delta_angle(self, position: Position) -> float:
         """Calculate the magnitude of the change in angle from the current angles to the target angles."""
@@ -171,4 +287,5 @@ if __name__ == "__main__":
     # Create position
     position = Position(angles=[110.0, 70.0, 0.0], name="Test Position")
     
-    servo_set.move_to_position(position, time=2.0, num_steps=100)
\ No newline at end of file
+    stats = servo_set.move_to_position(position, time=2.0, num_steps=100)
+    print(f'Move timing: {stats}')
\ No newline at end of file
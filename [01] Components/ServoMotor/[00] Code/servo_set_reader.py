@@ -8,6 +8,10 @@ from servo_controller import ServoController
 class ServoSetReader:
     servo_controller: ServoController | None = None
 
+    # Shared across all files read, so servo sets on the same bus use one I2C and one controller
+    _i2cs: dict[tuple[int, int, int], I2C] = {} # (id, sda, scl) -> I2C
+    _servo_controllers: dict[tuple[int, int, int, int], ServoController] = {} # (id, sda, scl, address) -> ServoController
+
     @classmethod
     def create_servo_from_file(cls, filename: str) -> ServoSet:
         with open(filename, 'r') as f:
@@ -24,8 +28,7 @@ class ServoSetReader:
                     identifier: str = words[0].strip().lower()
 
                     if identifier == 'i2c':
-                        i2c: I2C = cls.create_i2c_from_line(line)
-                        cls.servo_controller = ServoController(i2c)
+                        cls.servo_controller = cls.create_servo_controller_from_line(line)
 
                     elif identifier == 'i2c servo':
                         servo: ServoMotor = cls.create_i2c_servo_from_line(line, cls.servo_controller)
@@ -41,6 +44,38 @@ class ServoSetReader:
 
     @classmethod
     def create_i2c_from_line(cls, line: str) -> I2C:
+        id, sda_pin, scl_pin, _ = cls._parse_i2c_line(line)
+        return cls.get_i2c(id, sda_pin, scl_pin)
+
+    @classmethod
+    def create_servo_controller_from_line(cls, line: str) -> ServoController:
+        id, sda_pin, scl_pin, address = cls._parse_i2c_line(line)
+        return cls.get_servo_controller(id, sda_pin, scl_pin, address)
+
+    @classmethod
+    def get_i2c(cls, id: int, sda_pin: int, scl_pin: int) -> I2C:
+        """Return the I2C bus for the given id and pins, creating it the first time it is requested."""
+        key = (id, sda_pin, scl_pin)
+        i2c = cls._i2cs.get(key)
+        if i2c is None:
+            i2c = I2C(id=id, sda=Pin(sda_pin), scl=Pin(scl_pin))
+            cls._i2cs[key] = i2c
+        return i2c
+
+    @classmethod
+    def get_servo_controller(cls, id: int, sda_pin: int, scl_pin: int, address: int = ServoController.ADDRESS) -> ServoController:
+        """Return the controller at the given address on the given bus. It is created (and the PCA9685
+        reset) only the first time it is requested."""
+        key = (id, sda_pin, scl_pin, address)
+        servo_controller = cls._servo_controllers.get(key)
+        if servo_controller is None:
+            servo_controller = ServoController(cls.get_i2c(id, sda_pin, scl_pin), address=address)
+            cls._servo_controllers[key] = servo_controller
+        return servo_controller
+
+    @classmethod
+    def _parse_i2c_line(cls, line: str) -> tuple[int, int, int, int]:
+        """Parse 'i2c, id, sda, scl[, address]'. The address defaults to the PCA9685 default."""
         words = line.split(',')
         if len(words) < 4:
             raise ValueError("Invalid I2C line format")
@@ -48,9 +83,11 @@ class ServoSetReader:
         id: int = int(words[1].strip())
         sda_pin: int = int(words[2].strip())
         scl_pin: int = int(words[3].strip())
-        
+        address: int = ServoController.ADDRESS
+        if len(words) > 4 and words[4].strip() != '':
+            address = int(words[4].strip(), 0)
 
-        return I2C(id=id, sda=Pin(sda_pin), scl=Pin(scl_pin))   
+        return id, sda_pin, scl_pin, address
 
     @classmethod
     def create_i2c_servo_from_line(cls, line: str, controller: ServoController) -> I2CServoMotor:
@@ -6,11 +6,18 @@
 # Author: Sam Linton
 # Description: Legged robot
 #
+# All 12 joints are also held in one body ServoSet, so every move interpolates all
+# legs together on one timeline and each frame goes out as a single burst to the
+# shared servo controller. Moves can be run blocking, awaited, or started as a
+# background task so that other tasks (BLE, sensors) keep running while it moves.
+#
+import uasyncio as asyncio
 from servo_set_reader import ServoSetReader
 from servo_set import ServoSet
 from position_reader import PositionReader
 from position import Position
 from movement import Movement
+from trajectory import MoveStats
 
 
 class Strider:
@@ -19,29 +26,90 @@ class Strider:
        self._front_right_leg: ServoSet = ServoSetReader.create_servo_from_file(f"front_right_leg.srv")
        self._back_left_leg: ServoSet = ServoSetReader.create_servo_from_file(f"rear_left_leg.srv")
        self._back_right_leg: ServoSet = ServoSetReader.create_servo_from_file(f"rear_right_leg.srv")
+       self._legs: list[ServoSet] = [self._front_left_leg, self._front_right_leg, self._back_left_leg, self._back_right_leg]
+
+       # All joints, leg by leg, so a move covers every leg on one timeline
+       self._body: ServoSet = ServoSet(servos=[servo for leg in self._legs for servo in leg.servos], name='strider')
+       self._move_task = None
 
        self._positions: list[Position] = PositionReader.read_positions_from_file("strider.pos")
 
        self.home()
 
+    @property
+    def is_moving(self) -> bool:
+        return self._move_task is not None and not self._move_task.done()
+
+    @property
+    def move_stats(self) -> MoveStats:
+        """Timing of the last move."""
+        return self._body.move_stats
+
     def home(self) -> None:
         """Home all legs."""
-        for leg in [self._front_left_leg, self._front_right_leg, self._back_left_leg, self._back_right_leg]:
-            leg.move_to_position(leg.get_home_position())
+        self._body.move_to_position(self._body.get_home_position())
+
+    def move_to_position(self, position_name: str, time: float = 0.0, num_steps: int = 10) -> MoveStats:
+        """Move all legs to a named position together, blocking until done."""
+        return self._body.move_to_position(self._get_body_position(position_name), time, num_steps)
+
+    async def async_move_to_position(self, position_name: str, time: float = 0.0, num_steps: int = 10) -> MoveStats:
+        """Move all legs to a named position together, yielding to other tasks while moving."""
+        return await self._body.async_move_to_position(self._get_body_position(position_name), time, num_steps)
 
-    def move_to_position(self, position_name: str, time: float = 0.0, num_steps: int = 10) -> None:
-        """Move to a named position."""
-        position: Position = next(pos for pos in self._positions if pos.name == position_name)
+    def start_move(self, position_name: str, time: float = 0.0, num_steps: int = 10):
+        """Start moving to a named position in the background, replacing any move in progress.
+        The new move starts from wherever the joints were left.
 
-        
-        for leg in [self._front_left_leg, self._front_right_leg, self._back_left_leg, self._back_right_leg]:
-            leg.move_to_position(position, time, num_steps) 
+        Raises:
+            ValueError: if the position is unknown or out of range, before anything moves
 
-    
+        Returns:
+            Task: the task running the move
+        """
+        position: Position = self._get_body_position(position_name)
+        self._body._check_position(position) # Here, as the task's exceptions reach no caller
+        self.cancel_move()
+        self._move_task = asyncio.create_task(self._body.async_move_to_position(position, time, num_steps))
+        return self._move_task
+
+    def cancel_move(self) -> None:
+        """Stop the move in progress, if any. The joints hold at the last frame written."""
+        if self.is_moving:
+            self._move_task.cancel()
+        self._move_task = None
+
+    def _get_body_position(self, position_name: str) -> Position:
+        """Position for all joints. A position with angles for one leg is applied to every leg."""
+        position: Position | None = next((pos for pos in self._positions if pos.name == position_name), None)
+        if position is None:
+            raise ValueError(f"Unknown position: {position_name}")
+        if position.num_angles == len(self._body.servos):
+            return position
+
+        angles: list[float] = []
+        for leg in self._legs:
+            if position.num_angles != len(leg.servos):
+                raise ValueError("Position and servo count mismatch")
+            angles.extend(position.angles)
+        return Position(angles=angles, name=position_name)
 
 
 if __name__ == '__main__':
     strider = Strider()
     strider.move_to_position("forward", time=1.0, num_steps=20)
     strider.move_to_position("home", time=1.0, num_steps=20)
-    
\ No newline at end of file
+
+    # Walk in the background while another task keeps running
+    async def main():
+        for _ in range(3):
+            strider.start_move("forward", time=1.0, num_steps=50)
+            while strider.is_moving:
+                print('other work while moving')
+                await asyncio.sleep_ms(200)
+            print(strider.move_stats)
+            await strider.async_move_to_position("back", time=1.0, num_steps=50)
+        strider.home()
+
+    asyncio.run(main())
+
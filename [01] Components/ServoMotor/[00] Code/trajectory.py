@@ -0,0 +1,162 @@
+#
+# Trajectory
+#
+# Version: 1.00
+# Date: 2025-07-20
+# Author: Sam Linton
+# Description: Runs a timed servo move as a series of frames on a fixed timeline
+#
+# Step n of N is due at n * time / N after the start. The executor waits for each
+# deadline rather than sleeping a fixed amount after each write, so the time spent
+# writing to the bus does not add up. If writing falls behind so that later steps
+# are already due, the executor jumps to the latest due step and counts the skipped
+# ones as dropped. Either way the final step is always written, on time or as
+# close to it as the bus allows. A move with a time but a single step, such as a
+# dwell at the current position, writes that step at the end of the time.
+#
+from time import sleep_us, ticks_us, ticks_diff, ticks_add
+import uasyncio as asyncio
+
+
+class MoveStats:
+    """Timing report for one or more executed moves."""
+
+    def __init__(self) -> None:
+        self.num_steps: int = 0 # Steps planned
+        self.frames: int = 0 # Frames actually written
+        self.dropped: int = 0 # Steps skipped because the bus fell behind
+        self.max_late_us: int = 0 # Worst lateness of a frame versus its deadline
+        self.total_late_us: int = 0 # Sum of lateness over all frames
+        self.elapsed_us: int = 0 # Time from the start of each move to its last frame, summed
+
+    @property
+    def mean_late_us(self) -> float:
+        return self.total_late_us / self.frames if self.frames > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f'{self.frames}/{self.num_steps} frames, {self.dropped} dropped, ' + \
+            f'late: max {self.max_late_us} us, mean {self.mean_late_us:.0f} us, elapsed {self.elapsed_us} us'
+
+
+class Trajectory:
+    """Runs a move over a given time in a given number of steps.
+
+    The move itself is supplied as a function write_frame(t_norm) that writes the servos
+    for the normalized time t_norm in (0, 1]. The caller is expected to be at t_norm = 0
+    already; t_norm = 1.0 is always the last frame written.
+    """
+
+    def __init__(self, write_frame) -> None:
+        """constructor
+
+        Args:
+            write_frame (function): called with the normalized time of each frame to write
+        """
+        self._write_frame = write_frame
+        self._num_steps: int = 0
+        self._duration_us: int = 0
+        self._t_start: int = 0
+        self._step: int = 0
+        self._stats: MoveStats = MoveStats()
+
+    def run(self, time: float, num_steps: int, stats: MoveStats | None = None) -> MoveStats:
+        """Execute the move, blocking until the last frame has been written.
+
+        Args:
+            time (float): duration of the move in seconds
+            num_steps (int): number of frames to write if the bus keeps up
+            stats (MoveStats | None, optional): accumulate into these stats. Defaults to None (new stats).
+
+        Returns:
+            MoveStats: timing of the move
+        """
+        self._start(time, num_steps, stats)
+        while self._step < self._num_steps:
+            wait_us: int = self._next_step()
+            if wait_us > 0:
+                sleep_us(wait_us)
+            self._write_step()
+        self._stats.elapsed_us += ticks_diff(ticks_us(), self._t_start)
+        return self._stats
+
+    async def async_run(self, time: float, num_steps: int, stats: MoveStats | None = None) -> MoveStats:
+        """Execute the move, yielding to other tasks while waiting for each deadline.
+        Cancelling the task stops the move after the last frame written.
+
+        Args:
+            time (float): duration of the move in seconds
+            num_steps (int): number of frames to write if the bus keeps up
+            stats (MoveStats | None, optional): accumulate into these stats. Defaults to None (new stats).
+
+        Returns:
+            MoveStats: timing of the move
+        """
+        self._start(time, num_steps, stats)
+        while self._step < self._num_steps:
+            wait_us: int = self._next_step()
+            await asyncio.sleep_ms(wait_us // 1000 if wait_us > 0 else 0)
+
+            # Finish the sub-millisecond remainder without giving up the deadline
+            wait_us = ticks_diff(self._due(self._step), ticks_us())
+            if wait_us > 0:
+                sleep_us(wait_us)
+            self._write_step()
+        self._stats.elapsed_us += ticks_diff(ticks_us(), self._t_start)
+        return self._stats
+
+    def _start(self, time: float, num_steps: int, stats: MoveStats | None) -> None:
+        if stats is None:
+            stats = MoveStats()
+        self._stats = stats
+
+        # Immediate move if no time. A single step is still due at the end of the time.
+        if time is None or time <= 0.0:
+            num_steps = 1
+            time = 0.0
+        num_steps = max(1, num_steps)
+
+        self._num_steps = num_steps
+        self._duration_us = int(1_000_000 * time)
+        self._step = 0
+        self._stats.num_steps += num_steps
+        self._t_start = ticks_us()
+
+    def _due(self, step: int) -> int:
+        """Deadline (ticks_us) of the given step."""
+        return ticks_add(self._t_start, step * self._duration_us // self._num_steps)
+
+    def _next_step(self) -> int:
+        """Choose the next step to write from the elapsed time and return the wait until it is due, us."""
+        now: int = ticks_us()
+        step: int = self._step + 1
+
+        # Skip to the latest step that is already due if the bus has fallen behind
+        if self._duration_us > 0:
+            due_step: int = ticks_diff(now, self._t_start) * self._num_steps // self._duration_us
+            if due_step > step:
+                due_step = min(due_step, self._num_steps)
+                self._stats.dropped += due_step - step
+                step = due_step
+
+        self._step = step
+        return ticks_diff(self._due(step), now)
+
+    def _write_step(self) -> None:
+        late_us: int = ticks_diff(ticks_us(), self._due(self._step))
+        if late_us > 0:
+            self._stats.total_late_us += late_us
+            if late_us > self._stats.max_late_us:
+                self._stats.max_late_us = late_us
+
+        self._write_frame(self._step / self._num_steps)
+        self._stats.frames += 1
+
+
+if __name__ == '__main__':
+    # Time a dummy move that takes 3 ms per frame
+    def write_frame(t_norm: float) -> None:
+        sleep_us(3000)
+
+    trajectory = Trajectory(write_frame)
+    print(trajectory.run(time=1.0, num_steps=100))
+    print(trajectory.run(time=1.0, num_steps=500))
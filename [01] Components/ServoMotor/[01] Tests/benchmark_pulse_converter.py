@@ -0,0 +1,110 @@
+#
+# benchmark_pulse_converter
+#
+# Version: 1.00
+# Date: 2025-07-24
+# Author: Sam Linton
+# Description: Times the float angle to pulse conversions against PulseConverter
+#
+# Each float function below is the conversion the servo classes used before
+# PulseConverter. Run on the Pico with pulse_converter.py copied to the board.
+#
+import math
+from time import ticks_us, ticks_diff
+from pulse_converter import PulseConverter
+
+MIN_US: float = 544.0
+MAX_US: float = 2400.0
+FREQ: int = 50
+NUM_CALLS: int = 2000
+
+# Calibration of a typical servo: raw = raw_angle_0 + sign * angle
+RAW_ANGLE_0: float = 70.0
+SIGN: int = -1
+ANGLE_START: float = -70.0
+ANGLE_END: float = 45.0
+
+
+def us2duty(us: float, t_period_us: float) -> int:
+    return int((us / t_period_us) * 4096)
+
+def i2c_float(angle: float) -> int:
+    """I2CServoMotor: logical angle to raw angle to duty, recomputing the slope each call"""
+    raw_angle: float = RAW_ANGLE_0 + SIGN * angle
+    t_period_us: int = int(1_000_000 / FREQ)
+    min_duty: float = us2duty(MIN_US, t_period_us)
+    max_duty: float = us2duty(MAX_US, t_period_us)
+    slope: float = (max_duty - min_duty) / 180.0
+    return int(min_duty + slope * raw_angle)
+
+def pwm_float(angle: float) -> int:
+    """PWMServoMotor: logical angle to raw angle to ns"""
+    raw_angle: float = RAW_ANGLE_0 + SIGN * angle
+    us = MIN_US + (raw_angle / 180.0) * (MAX_US - MIN_US)
+    return int(us * 1000.0)
+
+SLOPE_RAD: float = (MIN_US - MAX_US) / (math.radians(0.0) - math.radians(180.0))
+
+def servo_base_float(deg: float) -> int:
+    """ServoBase and Servo: degrees to radians to us to ns"""
+    current_us = math.radians(deg) * SLOPE_RAD + MIN_US
+    return int(current_us * 1000.0)
+
+def time_calls(name: str, function, angles: list[float]) -> float:
+    t_start: int = ticks_us()
+    for angle in angles:
+        function(angle)
+    us_per_call: float = ticks_diff(ticks_us(), t_start) / len(angles)
+    print(f'{name:32s} {us_per_call:8.2f} us/call')
+    return us_per_call
+
+def max_difference(function_a, function_b, angle_start: float, angle_end: float) -> int:
+    """Largest difference between the two conversions over the range at 0.1 deg steps"""
+    worst: int = 0
+    n_start: int = round(10 * min(angle_start, angle_end))
+    n_end: int = round(10 * max(angle_start, angle_end))
+    for n in range(n_start, n_end + 1):
+        angle: float = n / 10
+        worst = max(worst, abs(function_a(angle) - function_b(angle)))
+    return worst
+
+
+if __name__ == '__main__':
+    # Same duty and ns mappings as the servo classes, with the calibration folded in
+    t_period_us: int = int(1_000_000 / FREQ)
+    min_duty: int = us2duty(MIN_US, t_period_us)
+    max_duty: int = us2duty(MAX_US, t_period_us)
+    duty_per_deg: float = (max_duty - min_duty) / 180.0
+    ns_per_deg: float = 1000.0 * (MAX_US - MIN_US) / 180.0
+
+    i2c_converter = PulseConverter(min_duty + duty_per_deg * RAW_ANGLE_0, SIGN * duty_per_deg, ANGLE_START, ANGLE_END)
+    i2c_table = PulseConverter(min_duty + duty_per_deg * RAW_ANGLE_0, SIGN * duty_per_deg, ANGLE_START, ANGLE_END, lookup_table=True)
+    pwm_converter = PulseConverter(1000.0 * MIN_US + ns_per_deg * RAW_ANGLE_0, SIGN * ns_per_deg, ANGLE_START, ANGLE_END)
+    pwm_table = PulseConverter(1000.0 * MIN_US + ns_per_deg * RAW_ANGLE_0, SIGN * ns_per_deg, ANGLE_START, ANGLE_END, lookup_table=True)
+    base_converter = PulseConverter(1000.0 * MIN_US, ns_per_deg, 0.0, 180.0)
+
+    angles: list[float] = [ANGLE_START + (ANGLE_END - ANGLE_START) * i / NUM_CALLS for i in range(NUM_CALLS)]
+    base_angles: list[float] = [180.0 * i / NUM_CALLS for i in range(NUM_CALLS)]
+    angles_10: list[int] = [round(10 * angle) for angle in angles]
+
+    print(f'{NUM_CALLS} conversions each')
+    print('Duty counts (I2CServoMotor, ServoList)')
+    t_float = time_calls('  float', i2c_float, angles)
+    t_fixed = time_calls('  fixed point', i2c_converter.to_output, angles)
+    t_table = time_calls('  table', i2c_table.to_output, angles)
+    t_int = time_calls('  fixed point, 0.1 deg int input', i2c_converter.to_output_10, angles_10)
+    print(f'  speedup: fixed {t_float / t_fixed:.1f}x, table {t_float / t_table:.1f}x, int input {t_float / t_int:.1f}x')
+    print(f'  max difference: {max_difference(i2c_float, i2c_converter.to_output, ANGLE_START, ANGLE_END)} counts')
+
+    print('Pulse width ns (PWMServoMotor)')
+    t_float = time_calls('  float', pwm_float, angles)
+    t_fixed = time_calls('  fixed point', pwm_converter.to_output, angles)
+    t_table = time_calls('  table', pwm_table.to_output, angles)
+    print(f'  speedup: fixed {t_float / t_fixed:.1f}x, table {t_float / t_table:.1f}x')
+    print(f'  max difference: {max_difference(pwm_float, pwm_converter.to_output, ANGLE_START, ANGLE_END)} ns')
+
+    print('Pulse width ns (ServoBase, Servo)')
+    t_float = time_calls('  float', servo_base_float, base_angles)
+    t_fixed = time_calls('  fixed point', base_converter.to_output, base_angles)
+    print(f'  speedup: fixed {t_float / t_fixed:.1f}x')
+    print(f'  max difference: {max_difference(servo_base_float, base_converter.to_output, 0.0, 180.0)} ns')
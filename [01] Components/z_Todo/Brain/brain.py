@@ -2,6 +2,7 @@
 # Brain
 #
 from ble_client import BLEClient
+from joystick_protocol import JoystickState
 from ST7735 import TFT
 from sysfont import sysfont
 from machine import SPI,Pin
@@ -14,7 +15,9 @@ class Brain:
         self.ble_client = BLEClient(
             server_name='JoystickController',
             receive_message_func=self.receive_message,
-            receive_interval_ms=1000)
+            receive_interval_ms=1000,
+            raw=True)
+        self.joystick = JoystickState()
         print(self.ble_client.is_connected())
         self.running = False
         self.screen = self.create_screen(spi, 16, 17, 18)
@@ -31,12 +34,12 @@ class Brain:
         self.screen.fill(TFT.BLACK)
         self.screen.text((0, 0), message, color, sysfont, fontsize)
         
-    def receive_message(self, message)-> str:
-        print(f'Message: {message}')
-        self.display(f'{message}', color=TFT.RED, fontsize=1)
-        values = message.split(',')
-        vals = (int(values[0], 16), int(values[0], 16), int(values[0], 16), int(values[0], 16), int(values[4]) % 2, int(values[4]) //2)
-        print(vals)
+    def receive_message(self, message: bytes)-> None:
+        if not self.joystick.decode(message):
+            return
+        print(self.joystick)
+        self.display(f'{self.joystick.left_x},{self.joystick.left_y},{self.joystick.right_x},{self.joystick.right_y},{self.joystick.buttons}',
+                     color=TFT.RED, fontsize=1)
         
     def start(self)-> None:
         asyncio.run(self.run_loop())
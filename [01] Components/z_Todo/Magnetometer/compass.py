@@ -0,0 +1,219 @@
+#
+# Compass
+#
+# Version: 1.00
+# Date: 2025-07-31
+# Author: Sam Linton
+# Description: Tilt-compensated heading from a QMC5883L magnetometer and an MPU6050
+#
+# The QMC5883L runs continuously at 200 Hz. poll() reads one status byte and only
+# reads the field (6 bytes, one burst) when a new sample is ready; with the DRDY pin
+# connected, not even the status byte is read until the pin signals a sample. Each
+# sample is corrected for hard-iron (offset) and soft-iron (3x3 matrix) distortion with
+# precomputed values, levelled with the pitch and roll from the accelerometer, and
+# turned into a heading that is cached for cheap reads.
+#
+# The heading is relative to magnetic north and, like InertialSensor, increases
+# turning left (counterclockwise seen from above). The magnetometer axes must be
+# aligned with the IMU axes.
+#
+# Pins
+# ----
+# QMC5883L DRDY - drdy_pin (optional, any GPIO)
+#
+import uasyncio as asyncio
+from array import array
+from machine import Pin
+from math import sqrt, atan2, sin, cos, degrees
+from ustruct import unpack_from
+from time import sleep_ms, ticks_ms, ticks_diff
+from qmc5883l import QMC5883L
+from imu import MPU6050
+
+
+class Compass:
+    def __init__(self, magnetometer: QMC5883L, imu: MPU6050 | None = None, drdy_pin: Pin | None = None) -> None:
+        """constructor
+
+        Args:
+            magnetometer (QMC5883L): magnetometer, set to continuous 200 Hz here
+            imu (MPU6050 | None, optional): source of pitch and roll. Its last snapshot is used, so
+                keep it updated. Without it the compass must be kept level. Defaults to None.
+            drdy_pin (Pin | None, optional): input wired to DRDY, to skip status reads. Defaults to None.
+        """
+        self._magnetometer: QMC5883L = magnetometer
+        self._imu: MPU6050 | None = imu
+        self._i2c = magnetometer.i2c
+
+        self._buf: bytearray = bytearray(6)
+        self._status: bytearray = bytearray(1)
+        self._offset: array = array('f', (0.0, 0.0, 0.0))  # Hard-iron offset
+        self._matrix: array = array('f', (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0))  # Soft-iron correction, row major
+        self._field: array = array('f', (0.0, 0.0, 0.0))  # Corrected field of the last sample
+        self._heading: float = 0.0
+        self._declination: float = 0.0
+        self.num_samples: int = 0
+
+        magnetometer.mode = QMC5883L.CONFIG_CONT
+        magnetometer.rate = QMC5883L.CONFIG_200HZ
+        magnetometer.reconfig()
+
+        self._drdy_pin: Pin | None = drdy_pin
+        self._drdy: bool = True  # Read once first, as DRDY only pulses again after a read
+        if drdy_pin is not None:
+            self._status[0] = 0  # Interrupt enabled
+            self._i2c.writeto_mem(QMC5883L.ADDR, QMC5883L.CONFIG2, self._status)
+            drdy_pin.irq(handler=self._on_drdy, trigger=Pin.IRQ_RISING, hard=True)
+
+    @property
+    def heading(self) -> float:
+        """Heading of the last sample in degrees, 0 to 360."""
+        return self._heading
+
+    @property
+    def field(self) -> tuple:
+        """Corrected field of the last sample, sensor axes."""
+        field = self._field
+        return (field[0], field[1], field[2])
+
+    @property
+    def declination(self) -> float:
+        return self._declination
+
+    @declination.setter
+    def declination(self, value: float) -> None:
+        """Angle in degrees added to the heading, e.g. to refer it to true north."""
+        self._declination = value
+
+    def set_calibration(self, offset, matrix=None) -> None:
+        """Set the hard-iron offset (x, y, z) and, optionally, the soft-iron matrix
+        (9 values, row major). Corrected field = matrix * (raw - offset).
+        """
+        for i in range(3):
+            self._offset[i] = offset[i]
+        if matrix is not None:
+            for i in range(9):
+                self._matrix[i] = matrix[i]
+
+    def calibrate(self, num_samples: int = 1000) -> tuple:
+        """Measure the offset and a diagonal soft-iron matrix while the robot is turned
+        through every orientation, from the extremes of each axis. Takes num_samples / 200 Hz.
+
+        Raises:
+            OSError: if the samples have not arrived within twice the time they should take,
+                e.g. with the magnetometer missing
+
+        Returns:
+            tuple: offset, matrix as passed to set_calibration
+        """
+        minimum: array = array('f', (1.0e9, 1.0e9, 1.0e9))
+        maximum: array = array('f', (-1.0e9, -1.0e9, -1.0e9))
+        timeout_ms: int = 2 * num_samples * 1000 // 200
+        t_start: int = ticks_ms()
+        count: int = 0
+        while count < num_samples:
+            if not self._read_raw():
+                if ticks_diff(ticks_ms(), t_start) > timeout_ms:
+                    raise OSError(f'QMC5883L sent {count} of {num_samples} samples in {timeout_ms} ms')
+                sleep_ms(1)
+                continue
+            x, y, z = unpack_from('<3h', self._buf)
+            for i, value in ((0, x), (1, y), (2, z)):
+                minimum[i] = min(minimum[i], value)
+                maximum[i] = max(maximum[i], value)
+            count += 1
+
+        offset: tuple = tuple((maximum[i] + minimum[i]) / 2 for i in range(3))
+        radii: list[float] = [max(1.0, (maximum[i] - minimum[i]) / 2) for i in range(3)]
+        radius: float = sum(radii) / 3
+        matrix: tuple = (radius / radii[0], 0.0, 0.0, 0.0, radius / radii[1], 0.0, 0.0, 0.0, radius / radii[2])
+        self.set_calibration(offset, matrix)
+        return offset, matrix
+
+    def poll(self) -> bool:
+        """Take the new sample, if there is one, and update the heading.
+
+        Returns:
+            bool: True if there was a new sample
+        """
+        if not self._read_raw():
+            return False
+
+        raw_x, raw_y, raw_z = unpack_from('<3h', self._buf)
+        offset = self._offset
+        dx: float = raw_x - offset[0]
+        dy: float = raw_y - offset[1]
+        dz: float = raw_z - offset[2]
+        m = self._matrix
+        mx: float = m[0] * dx + m[1] * dy + m[2] * dz
+        my: float = m[3] * dx + m[4] * dy + m[5] * dz
+        mz: float = m[6] * dx + m[7] * dy + m[8] * dz
+        field = self._field
+        field[0] = mx
+        field[1] = my
+        field[2] = mz
+
+        # Level the field with the roll and pitch seen by the accelerometer
+        if self._imu is not None:
+            ax, ay, az = self._imu.accel.cached_xyz
+            roll: float = atan2(ay, az)
+            pitch: float = atan2(-ax, sqrt(ay * ay + az * az))
+            sin_roll: float = sin(roll)
+            cos_roll: float = cos(roll)
+            xh: float = mx * cos(pitch) + (my * sin_roll + mz * cos_roll) * sin(pitch)
+            yh: float = my * cos_roll - mz * sin_roll
+        else:
+            xh = mx
+            yh = my
+
+        heading: float = degrees(atan2(-yh, xh)) + self._declination
+        while heading < 0.0:
+            heading += 360.0
+        while heading >= 360.0:
+            heading -= 360.0
+        self._heading = heading
+        self.num_samples += 1
+        return True
+
+    async def run(self, period_ms: int = 5) -> None:
+        """Poll every period_ms, keeping the heading current."""
+        while True:
+            self.poll()
+            await asyncio.sleep_ms(period_ms)
+
+    def _read_raw(self) -> bool:
+        """Read the raw field into the buffer if a new sample is ready."""
+        if self._drdy_pin is not None:
+            if not self._drdy:
+                return False
+            self._drdy = False
+        else:
+            self._i2c.readfrom_mem_into(QMC5883L.ADDR, QMC5883L.STATUS, self._status)
+            if not self._status[0] & QMC5883L.STATUS_DRDY:
+                return False
+        self._i2c.readfrom_mem_into(QMC5883L.ADDR, QMC5883L.X_LSB, self._buf)
+        return True
+
+    def _on_drdy(self, pin: Pin) -> None:
+        self._drdy = True
+
+    def __str__(self) -> str:
+        return f'Compass: heading {self._heading:.1f} deg, {self.num_samples} samples'
+
+
+if __name__ == '__main__':
+    from machine import I2C
+    from time import sleep
+
+    i2c = I2C(0, scl=Pin(1), sda=Pin(0), freq=400_000)
+    imu = MPU6050(i2c)
+    compass = Compass(QMC5883L(i2c), imu)
+
+    print('Turn the robot through every orientation...')
+    print(compass.calibrate())
+
+    while True:
+        imu.snapshot()
+        compass.poll()
+        print(compass)
+        sleep(0.1)
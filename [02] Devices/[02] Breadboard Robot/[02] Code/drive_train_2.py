@@ -6,12 +6,42 @@
 # Author: Sam Linton
 # Description:  This module controls a drive train with 2 motors using a motor driver DRV8833.
 #
+# Turns and heading hold are closed loop on the IMU and run as asyncio tasks that
+# yield every control period, so BLE and sensor tasks keep running while turning.
+# The heading loop (P) asks for a yaw rate, limited to max_rate, and the rate loop
+# (PID plus feed-forward) sets the motor output, whose change per second is limited
+# by slew. Headings are in degrees and, like the gyro, increase turning left.
 #
 from machine import Pin, PWM, I2C
-from time import sleep, ticks_us
+from time import sleep, ticks_us, ticks_ms, ticks_diff
+import uasyncio as asyncio
 from imu import MPU6050
 
 
+class PID:
+    """PID controller with the integral limited to +/- limit (anti-windup).
+    """
+
+    def __init__(self, kp: float, ki: float = 0.0, kd: float = 0.0, limit: float = 100.0)-> None:
+        self.kp: float = kp
+        self.ki: float = ki
+        self.kd: float = kd
+        self._limit: float = limit
+        self._integral: float = 0.0
+        self._error_prev: float = 0.0
+
+    def reset(self)-> None:
+        self._integral = 0.0
+        self._error_prev = 0.0
+
+    def update(self, error: float, dt: float)-> float:
+        """Output for the error over a step of dt seconds."""
+        self._integral = max(-self._limit, min(self._limit, self._integral + self.ki * error * dt))
+        derivative: float = (error - self._error_prev) / dt if dt > 0.0 else 0.0
+        self._error_prev = error
+        return self.kp * error + self._integral + self.kd * derivative
+
+
 class DriveTrain:
     """Class to control a drive train with 2 motors using a motor driver.
     The motor driver is controlled using PWM signals to control the speed and
@@ -24,7 +54,8 @@ class DriveTrain:
                  left_pins=(10, 11),
                  right_pins=(12, 13),
                  imu: MPU6050 = None,
-                 frequency: int=20_000)-> None: 
+                 frequency: int=20_000,
+                 compass: 'Compass' = None)-> None: 
         """Initialize the DriveTrain object with the pins for the motors. Optionally 
         set the frequency of the PWM signal.
 
@@ -32,6 +63,7 @@ class DriveTrain:
             left_pins (Tuple[int]): PWM pin numbers for left motor
             right_pins (Tuple[int]): PWM pin numbersfor right motor
             frequency (int, optional): frequency of PWM signal (Hz). Defaults to 20_000.
+            compass (Compass, optional): absolute heading for turns, corrects the gyro heading. Defaults to None.
         """
         
         # Create the PWM objects for the motor driver
@@ -44,8 +76,33 @@ class DriveTrain:
         
         self._turn_rate = 500.0
         self._imu = imu
+        self._compass = compass
         if self._imu is None:
             print('>>>>>>>>>>>>> imu is None')
+
+        # Closed loop turning
+        self.period_ms: int = 10 # Control period
+        self.max_rate: float = 180.0 # Largest yaw rate asked for, deg/s
+        self.slew: float = 400.0 # Largest change in motor output, % per s
+        self.tolerance: float = 2.0 # Heading error accepted at the end of a turn, deg
+        self.settle_rate: float = 10.0 # Yaw rate below which a turn counts as stopped, deg/s
+        self.compass_wait_ms: int = 500 # Longest wait for a compass sample when control starts
+        self._heading_pid: PID = PID(kp=4.0)
+        self._rate_pid: PID = PID(kp=0.2, ki=0.5, kd=0.0, limit=50.0)
+        self._feed_forward: float = 100.0 / self._turn_rate # % output per deg/s
+
+        self._heading: float = 0.0 # Unwrapped, deg
+        self._rate: float = 0.0 # deg/s
+        self._gyro_bias: float = 0.0 # deg/s
+        self._compass_prev: float = 0.0
+        self._compass_heading: float = 0.0 # Unwrapped compass heading, deg
+        self._use_compass: bool = False # False if the compass gave no sample when control started
+        self._output: float = 0.0 # Turning output of the last step, positive turning left
+            
+    @property
+    def heading(self)-> float:
+        """Heading in degrees since the start, unwrapped, increasing turning left."""
+        return self._heading
             
     def move(self, left_speed: int, right_speed: int, time: float = None)-> None:
         """Arbitrary motion, controlling the speed of each motor independently.
@@ -116,36 +173,145 @@ class DriveTrain:
         self.move(speed, -speed, time)
         
     def turn_by(self, angle: float, speed: int = 70) -> None:
-        print(f'Turn {angle} degrees with speed {speed}')
-        
-        if self._imu is None:
+        """Turn right by angle degrees (left if negative), blocking until done.
+        Without an IMU or compass the turn is timed.
+
+        This runs its own event loop with asyncio.run, so it must not be called while
+        one is running, e.g. from a task; there, await async_turn_by instead.
+        """
+        if self._imu is None and self._compass is None:
             time = angle / self._turn_rate
             self.turn_right(speed = speed, time = time)
             return
         
-        ang = 0.0
-        sign = 1 if angle > 0.0 else -1
-        #rot_ref = self._imu.gyro.z
-        rot_ref = 0
-        print(f'rot_ref: {rot_ref}')
-        t = ticks_us()
+        asyncio.run(self.async_turn_by(angle, speed))
         
-        self.move(sign * speed, -sign * speed)
+    def calibrate_gyro(self, num_samples: int = 50)-> float:
+        """Measure the yaw rate reading at rest, subtracted from every reading.
+
+        Returns:
+            float: gyro bias in deg/s
+        """
+        total: float = 0.0
+        for _ in range(num_samples):
+            self._imu.snapshot()
+            total += self._imu.gyro.cached_xyz[2]
+            sleep(0.002)
+        self._gyro_bias = total / num_samples
+        return self._gyro_bias
         
-        while sign*ang < sign*angle:
-            rot_raw = self._imu.gyro.z
-            rot = rot_raw - rot_ref
-            if abs(rot) < 1.0: rot = 0.0
-            
-            tn = ticks_us()
-            dt = 1.0e-06 * (tn - t)
-            ang -=  dt * rot
-            
-            t = tn
-            print(f'{rot_raw} {rot} {ang}')
-            sleep(0.01)
-            
-        self.stop()
+    async def async_turn_by(self, angle: float, speed: int = 70, tolerance: float = None, timeout: float = 5.0)-> bool:
+        """Turn right by angle degrees (left if negative), yielding every control period.
+
+        Args:
+            angle (float): angle to turn, deg
+            speed (int, optional): largest motor output while turning, 0-100. Defaults to 70.
+            tolerance (float, optional): heading error accepted, deg. Defaults to self.tolerance.
+            timeout (float, optional): time allowed, including any wait for a compass sample, s. Defaults to 5.0.
+
+        Returns:
+            bool: True if the heading was reached and the robot stopped turning within the timeout
+        """
+        tolerance = self.tolerance if tolerance is None else tolerance
+        t_start: int = ticks_ms()
+        if not await self._start_control(min(self.compass_wait_ms, int(1000 * timeout))):
+            return False
+        target: float = self._heading - angle
+        t_prev: int = ticks_us()
+        reached: bool = False
+        try:
+            while ticks_diff(ticks_ms(), t_start) < 1000 * timeout:
+                await asyncio.sleep_ms(self.period_ms)
+                t_now: int = ticks_us()
+                dt: float = 1.0e-06 * ticks_diff(t_now, t_prev)
+                t_prev = t_now
+                error: float = self._control_step(target, 0.0, speed, dt)
+                if abs(error) <= tolerance and abs(self._rate) <= self.settle_rate:
+                    reached = True
+                    break
+        finally:
+            self.stop()
+        return reached
+        
+    async def hold_heading(self, speed: int = 0, heading: float = None, max_turn: int = 50)-> None:
+        """Drive at speed, steering to keep the heading, until the task is cancelled.
+
+        Args:
+            speed (int, optional): forward speed, -100 to 100. Defaults to 0.
+            heading (float, optional): heading to hold. Defaults to the current heading.
+            max_turn (int, optional): largest steering output, 0-100. Defaults to 50.
+        """
+        if not await self._start_control(self.compass_wait_ms):
+            return
+        target: float = self._heading if heading is None else heading
+        t_prev: int = ticks_us()
+        try:
+            while True:
+                await asyncio.sleep_ms(self.period_ms)
+                t_now: int = ticks_us()
+                dt: float = 1.0e-06 * ticks_diff(t_now, t_prev)
+                t_prev = t_now
+                self._control_step(target, speed, max_turn, dt)
+        finally:
+            self.stop()
+        
+    async def _start_control(self, timeout_ms: int)-> bool:
+        """Reset the controllers and wait, yielding, up to timeout_ms for a compass sample
+        to start from. Without one the heading comes from the gyro alone.
+
+        Returns:
+            bool: False if there is no heading to control, i.e. no IMU and no compass sample
+        """
+        self._heading_pid.reset()
+        self._rate_pid.reset()
+        self._output = 0.0
+        self._use_compass = False
+        if self._compass is not None:
+            t_start: int = ticks_ms()
+            while not self._compass.poll():
+                if ticks_diff(ticks_ms(), t_start) >= timeout_ms:
+                    print('No compass sample, using the gyro alone')
+                    return self._imu is not None
+                await asyncio.sleep_ms(1)
+            self._use_compass = True
+            self._compass_prev = self._compass.heading
+            self._compass_heading = self._heading
+        return True
+        
+    def _control_step(self, target: float, speed: float, max_output: float, dt: float)-> float:
+        """Update the heading, then set the motors to steer towards the target.
+
+        Returns:
+            float: heading error, deg
+        """
+        self._update_heading(dt)
+        error: float = target - self._heading
+        rate_target: float = max(-self.max_rate, min(self.max_rate, self._heading_pid.update(error, dt)))
+        output: float = self._feed_forward * rate_target + self._rate_pid.update(rate_target - self._rate, dt)
+        
+        # Limit how fast and how far the output changes
+        step: float = self.slew * dt
+        output = max(self._output - step, min(self._output + step, output))
+        output = max(-max_output, min(max_output, output))
+        self._output = output
+        self.move(speed - output, speed + output)
+        return error
+        
+    def _update_heading(self, dt: float)-> None:
+        """Integrate the yaw rate of one burst IMU read; take the compass heading when it has a new sample."""
+        if self._imu is not None:
+            self._imu.snapshot()
+            self._rate = self._imu.gyro.cached_xyz[2] - self._gyro_bias
+            self._heading += self._rate * dt
+        if self._use_compass and self._compass.poll():
+            change: float = self._compass.heading - self._compass_prev
+            if change > 180.0: change -= 360.0
+            if change < -180.0: change += 360.0
+            self._compass_prev = self._compass.heading
+            if self._imu is None and dt > 0.0:
+                self._rate = (self._compass_heading + change - self._heading) / dt
+            self._compass_heading += change
+            self._heading = self._compass_heading
         
     def _speed_to_duty_cycle(self, speed: int)-> int:
         """Convert a speed (0-100) to a duty cycle. The speed is clamped
@@ -10,6 +10,7 @@
 # The robot uses tank-drive with two joysticks.
 #
 from ble_client import BLEClient
+from joystick_protocol import JoystickState
 from machine import Pin, PWM
 from buzzer import Buzzer
 from servo import Servo
@@ -39,6 +40,9 @@ buzzer = Buzzer(pin = 22)
 launcher = Servo(pin_id = 16)
 launcher.write(180)
 
+# Joystick state, updated from each frame
+joystick = JoystickState()
+
 def connected():
     """Callback function when a BLE connection is established."""
     print('CONNECTED')
@@ -59,8 +63,8 @@ def launch():
     launcher.write(180)
     
 def get_speed(value):
-    """Convert joystick value to motor speed."""
-    speed = 2 * value - HIGH
+    """Convert joystick axis (-32767 to 32767) to motor speed."""
+    speed = 2 * value
     if abs(speed) < 5000:
         speed = 0
     return speed
@@ -87,23 +91,18 @@ def move(left_speed, right_speed):
         right_2.duty_u16(-right_speed)
 
 def receive_message(message):
-    """Receive a message from the BLE client and interpret it to 
+    """Receive a joystick_protocol frame from the BLE client and interpret it to 
     control the robot."""
-    values = message.split(',')
-    left_x_value = int(values[0])
-    left_y_value = int(values[1])
-    right_x_value = int(values[2])
-    right_y_value = 0
-    left_button = int(values[4])
-    right_button = int(values[5])
-    if left_button == 0:
+    if not joystick.decode(message):
+        return
+    if joystick.left_button:
         launch()
     
     # Two joysticks, tank-drive
-    left_speed = get_speed(left_x_value) # 2 * left_value - HIGH
-    right_speed = get_speed(right_x_value)
+    left_speed = get_speed(joystick.left_x)
+    right_speed = get_speed(joystick.right_x)
     
-    print(f'{left_x_value},{left_y_value},{right_x_value},{right_y_value},{left_button},{right_button}')
+    print(joystick)
     move(left_speed, right_speed)
 
     
@@ -112,7 +111,8 @@ client = BLEClient(
     on_connected_func=connected,
     on_disconnected_func=disconnected,
     receive_message_func=receive_message,
-    receive_interval_ms=100)
+    receive_interval_ms=100,
+    raw=True)
 
 client.start()
 
@@ -9,8 +9,11 @@
 # connection status.
 
 from ble_server import BLEServer
+from joystick_protocol import JoystickEncoder, LEFT_BUTTON, RIGHT_BUTTON
+from joystick_sampler import JoystickSampler
 from machine import Pin, ADC
 from buzzer import Buzzer
+import uasyncio as asyncio
 
 # Bluetooth connection light
 led = Pin(6, Pin.OUT)
@@ -23,9 +26,16 @@ right_x = ADC(28)
 l_button = Pin(2, Pin.IN, Pin.PULL_UP)
 r_button = Pin(3, Pin.IN, Pin.PULL_UP)
 
+# Reads and filters the sticks in the background, centring them at start up
+sampler = JoystickSampler([left_x, left_y, right_x], sample_rate = 400)
+
 # Buzzer
 buzzer = Buzzer(pin = 22)
 
+# Packs the readings into a binary frame, reusing one buffer. Stick movement
+# smaller than the deadband (out of 32767), e.g. ADC noise, is not sent.
+encoder = JoystickEncoder(deadband = 1000)
+
 def connected():
     """Callback function when a BLE connection is established."""
     print('CONNECTED')
@@ -38,15 +48,22 @@ def disconnected():
     led.off()
     buzzer.end_sound()
     
-def create_message():
-    """Create a message to send to the connected BLE client."""
-    left_x_value = left_x.read_u16()
-    left_y_value = left_y.read_u16()
-    right_x_value = right_x.read_u16()
+def create_message(force=False):
+    """Create a joystick_protocol frame to send to the connected BLE client,
+    or None if nothing changed since the last one and force is False."""
+    left_x_value = sampler.axis(0)
+    left_y_value = sampler.axis(1)
+    right_x_value = sampler.axis(2)
     right_y_value = 0
     
-    message = f'{left_x_value},{left_y_value},{right_x_value},{right_y_value},{l_button.value()},{r_button.value()}'
-    return message
+    # The buttons are pulled up, so read 0 while pressed
+    buttons = 0
+    if l_button.value() == 0:
+        buttons |= LEFT_BUTTON
+    if r_button.value() == 0:
+        buttons |= RIGHT_BUTTON
+    
+    return encoder.encode_if_changed(left_x_value, left_y_value, right_x_value, right_y_value, buttons, force)
 
 
 server = BLEServer(
@@ -54,6 +71,11 @@ server = BLEServer(
     create_message_func = create_message,
     on_connected_func=connected,
     on_disconnected_func=disconnected,
-    send_interval_ms = 100)
+    send_interval_ms = 20, # Latency of a change
+    keepalive_ms = 500) # Send the current state when nothing changed
+
+async def main():
+    asyncio.create_task(sampler.run())
+    await server.run_loop()
 
-server.start()
\ No newline at end of file
+asyncio.run(main())
\ No newline at end of file
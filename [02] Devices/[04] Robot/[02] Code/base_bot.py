@@ -6,9 +6,8 @@
 # Date: 2025-06-06
 # Description: Remote control or autonomous robot
 #
-# Consider: change JoystickController output to -100 to 100
-#
 from ble_client import BLEClient
+from joystick_protocol import JoystickState, AXIS_MAX
 from machine import Pin
 import uasyncio as asyncio
 from drive_train import DriveTrain
@@ -32,7 +31,11 @@ class BaseRobot:
             receive_message_func=self.receive_message,
             on_connected_func=self.on_connected,
             on_disconnected_func=self.on_disconnected,
-            receive_interval_ms=50)
+            receive_interval_ms=50,
+            raw=True)
+        
+        # Joystick state, updated from each frame
+        self.joystick: JoystickState = JoystickState()
         
         # Create DriveTrain (two motors)
         self.drive_train: DriveTrain = DriveTrain(left_pins, right_pins)
@@ -41,21 +44,42 @@ class BaseRobot:
         self.led: Pin | None = None if led_pin is None else Pin(led_pin, Pin.OUT)
         self.buzzer: Buzzer | None = None if buzzer_pin is None else Buzzer(pin=buzzer_pin)
         
+        # Subsystems handed the joystick state from each frame, in order
+        self.handlers: list = [self.toggle_autonomous, self.drive]
+        
         # RC Car state
         self.running: bool = False
         
-    def receive_message(self, message: str)-> None:
+    def subscribe(self, handler)-> None:
+        """Add a subsystem to the joystick subscription table. Every good frame is decoded
+        once and the same JoystickState is passed to each handler in turn, so adding a
+        subsystem adds no parsing.
+
+        Args:
+            handler (function): called as handler(joystick) with the JoystickState
+        """
+        self.handlers.append(handler)
+
+    def receive_message(self, message: bytes)-> None:
         """Function to run when a message is received from the BLE server.
 
         Args:
-            message (str): message from the JoystickController
+            message (bytes): joystick_protocol frame from the JoystickController
         """
+        # Decode the frame once; a bad one is ignored
+        joystick: JoystickState = self.joystick
+        if not joystick.decode(message):
+            return
+        for handler in self.handlers:
+            handler(joystick)
 
-        # Parse the message
-        vals: tuple[int, int, int, int, int, int] = self.get_values(message)
+    def toggle_autonomous(self, joystick: JoystickState)-> None:
+        """Switch to autonomous mode when both buttons are pressed.
 
-        # Toggle autonomous mode
-        if vals[4] == 1 and vals[5] == 1:
+        Args:
+            joystick (JoystickState): latest joystick state
+        """
+        if joystick.left_button and joystick.right_button:
             self.autonomous = not self.autonomous
 
         if self.autonomous:
@@ -64,31 +88,17 @@ class BaseRobot:
             self.run_autonomous()
             self.autonomous = False
             exit()
-            return
-
-        # Calculate the speed of the left and right motors
-        left_speed = 100 * (vals[0] - 13447) / 13447
-        right_speed = 100 * (vals[2] - 13447) / 13447
-        self.drive_train.move(left_speed, right_speed)
 
-    def get_values(self, message: str)-> tuple:
-        """Get the values from the message.
+    def drive(self, joystick: JoystickState)-> None:
+        """Tank drive: the left stick x sets the left motor speed and the right stick x the right.
 
         Args:
-            message (str): message from the JoystickController
-
-        Returns:
-            tuple: values from the message
+            joystick (JoystickState): latest joystick state
         """
-        values = message.split(',')
-        vals = (int(values[0], 16), 
-                int(values[1], 16), 
-                int(values[2], 16), 
-                int(values[3], 16), 
-                int(values[4]) % 2, 
-                int(values[4]) //2)
-        return vals
-        
+        left_speed = 100 * joystick.left_x / AXIS_MAX
+        right_speed = 100 * joystick.right_x / AXIS_MAX
+        self.drive_train.move(left_speed, right_speed)
+
     def on_connected(self):
         """Function to run when the BLE connection is established.
         """
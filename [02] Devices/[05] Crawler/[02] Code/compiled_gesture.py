@@ -0,0 +1,126 @@
+#
+# CompiledGesture
+#
+# Version: 1.00
+# Date: 2025-07-22
+# Author: Sam Linton
+# Description: A gesture precomputed as PCA9685 register images, one per step.
+#
+# Each frame is the LEDn_ON_L..LEDn_OFF_H block for the channels from the lowest to
+# the highest servo index of the gesture, so playing a frame is a single burst write
+# of a memoryview with no float math or allocation. Channels inside that span that
+# are not part of the gesture are copied from the controller's register image just
+# before each frame is sent, so they are rewritten with the values they have at that
+# moment, including any written meanwhile, e.g. by another move during async
+# playback. A frame identical to the one last sent is skipped and counted as a
+# suppressed write.
+#
+import ustruct
+from gesture import Gesture
+from servo_controller import ServoController
+
+
+class CompiledGesture:
+    """Frames of duty values for a gesture at a fixed number of steps."""
+
+    def __init__(self, gesture: Gesture, num_steps: int, angle_to_duty) -> None:
+        """Compile the gesture. Raises ValueError if any angle is out of range for its servo.
+
+        Args:
+            gesture (Gesture): gesture to compile
+            num_steps (int): number of steps after the start; frames are at t_norm = n / num_steps
+            angle_to_duty (function): angle_to_duty(index, angle) returns the duty value for a servo
+        """
+        indices: list[int] = gesture.indices
+        self._indices: list[int] = indices
+        self._num_steps: int = max(1, num_steps)
+        self._first_channel: int = min(indices)
+        num_channels: int = max(indices) - self._first_channel + 1
+
+        # One block of registers per frame, with a view onto each
+        frame_size: int = 4 * num_channels
+        self._frames: bytearray = bytearray(frame_size * (self._num_steps + 1))
+        frames_mv = memoryview(self._frames)
+        self._views: list[memoryview] = [frames_mv[n * frame_size:(n + 1) * frame_size] for n in range(self._num_steps + 1)]
+
+        # Runs of channels in the span that the gesture does not drive, as (first channel,
+        # number of channels), and a view onto each run in each frame
+        self._gaps: list[tuple[int, int]] = []
+        for channel in range(self._first_channel, self._first_channel + num_channels):
+            if channel in indices:
+                continue
+            if self._gaps and self._gaps[-1][0] + self._gaps[-1][1] == channel:
+                self._gaps[-1] = (self._gaps[-1][0], self._gaps[-1][1] + 1)
+            else:
+                self._gaps.append((channel, 1))
+        self._gap_views: list[list[memoryview]] = [
+            [view[4 * (channel - self._first_channel):4 * (channel - self._first_channel + count)] for channel, count in self._gaps]
+            for view in self._views] if self._gaps else []
+
+        angles: list[float] = [0.0] * len(indices)
+        for n in range(self._num_steps + 1):
+            gesture.get_angles(n / self._num_steps, angles)
+            for j in range(len(indices)):
+                offset: int = n * frame_size + 4 * (indices[j] - self._first_channel)
+                ustruct.pack_into('<HH', self._frames, offset, 0, angle_to_duty(indices[j], angles[j]))
+
+        self._end_angles: list[float] = gesture.get_angles(1.0)
+
+        # Frames in a run of identical frames share the number of the first one
+        self._runs: list[int] = [0] * (self._num_steps + 1)
+        for n in range(1, self._num_steps + 1):
+            same: bool = self._frames[n * frame_size:(n + 1) * frame_size] == self._frames[(n - 1) * frame_size:n * frame_size]
+            self._runs[n] = self._runs[n - 1] if same else n
+        self._last_run: int = -1
+
+    @property
+    def indices(self) -> list[int]:
+        return self._indices
+
+    @property
+    def num_steps(self) -> int:
+        return self._num_steps
+
+    @property
+    def end_angles(self) -> list[float]:
+        """Logical angles of the servos at the end of the gesture."""
+        return self._end_angles
+
+    def reset(self) -> None:
+        """Call before playback, so the next frame is always sent."""
+        self._last_run = -1
+
+    def write_frame(self, servo_controller: ServoController, step: int) -> None:
+        """Send frame step (0..num_steps) to the controller in one burst, with the channels
+        the gesture does not drive taken from the controller's current register image.
+        """
+        run: int = self._runs[step]
+        if run == self._last_run:
+            servo_controller.writes_suppressed += 1
+            return
+        if self._gap_views:
+            gaps: list[tuple[int, int]] = self._gaps
+            views: list[memoryview] = self._gap_views[step]
+            for i in range(len(gaps)):
+                servo_controller.read_channels(gaps[i][0], views[i])
+        servo_controller.write_channels(self._first_channel, self._views[step])
+        self._last_run = run
+
+    def __str__(self) -> str:
+        return f'CompiledGesture with {len(self._indices)} servos, {self._num_steps} steps, {len(self._frames)} bytes.'
+
+
+if __name__ == '__main__':
+    gesture = Gesture(
+        angles=[
+            [0.0, 40.0, 90.0, 40.0, 0.0],
+            [0.0, 0.0, 0.0, 0.0, 0.0],
+        ],
+        indices=[0, 2],
+        name='Generic')
+
+    # Linear calibration in place of a ServoList
+    compiled = CompiledGesture(gesture, 10, lambda index, angle: int(102 + 2.27 * angle))
+    print(compiled)
+    for n in range(compiled.num_steps + 1):
+        print(n, ustruct.unpack('<6H', compiled._views[n]))
@@ -40,16 +40,19 @@ class Gesture:
             self._indices: list[int] = indices # indices of servos
         
         self._name: str = name
+        self._cursor: int = 0 # Interval of the last lookup
 
     @property
     def indices(self) -> list[int]:
         return self._indices
 
-    def get_angles(self, time: float) -> list[float]:
+    def get_angles(self, time: float, angles: list[float] | None = None) -> list[float]:
         """Get the angles in degrees for all servos at the given normalized time point.
 
         Args:
             time (float): normalized time point [0, 1]
+            angles (list[float] | None, optional): buffer with one entry per servo to write the
+                angles into. Defaults to None, which returns a new list.
 
         Raises:
             ValueError: if the time is out of range
@@ -60,11 +63,47 @@ class Gesture:
         if time < self._times[0] or time > self._times[-1]:
             raise ValueError(f'Time {time} is out of range.')
         
-        for i in range(len(self._times) - 1):
-            if self._times[i] <= time and time <= self._times[i + 1]:
-                xi: float = (time - self._times[i]) / (self._times[i + 1] - self._times[i])
-                xim: float = 1.0 - xi
-                return [xim * self._angles[j][i] + xi * self._angles[j][i+1] for j in range(len(self._indices))] 
+        i: int = self._find_segment(time)
+        dt: float = self._times[i + 1] - self._times[i]
+        xi: float = (time - self._times[i]) / dt if dt > 0.0 else 1.0
+        xim: float = 1.0 - xi
+
+        num_servos: int = len(self._indices)
+        if angles is None:
+            angles = [0.0] * num_servos
+        for j in range(num_servos):
+            angles_j: list[float] = self._angles[j]
+            angles[j] = xim * angles_j[i] + xi * angles_j[i + 1]
+        return angles
+
+    def _find_segment(self, time: float) -> int:
+        """Index i of the time interval [times[i], times[i + 1]] holding the time: the last
+        i with times[i] <= time, so that a repeated time point starts the later interval.
+
+        The search starts from the interval found last and moves forward up to two
+        intervals, so stepping forward through the gesture takes constant time.
+        Otherwise binary search. Either way the result depends only on the time.
+        """
+        times: list[float] = self._times
+        last: int = len(times) - 2
+        i: int = self._cursor
+        if times[i] <= time:
+            for _ in range(3):
+                if i == last or time < times[i + 1]:
+                    self._cursor = i
+                    return i
+                i += 1
+
+        lo: int = 0
+        hi: int = len(times) - 2
+        while lo < hi:
+            mid: int = (lo + hi + 1) // 2
+            if times[mid] <= time:
+                lo = mid
+            else:
+                hi = mid - 1
+        self._cursor = lo
+        return lo
             
     def check(self) -> None:
         """Check that the gesture is valid.
@@ -140,14 +179,15 @@ if __name__ == '__main__':
 
     num_steps: int = 10
     dt: float = 1.0 / num_steps
+    angles: list[float] = [0.0] * len(gesture.indices)
     
     print('Servo indices:', gesture.indices)
     for i in range(num_steps + 1):
         t: float = max(0, min(1.0, i * dt))
-        angle: list[float] = gesture.get_angles(t)
+        gesture.get_angles(t, angles)
         print(f't: {t:3.1f}', end='\t')
         for j in range(len(gesture.indices)):
-            print(f' {gesture.get_angles(t)[j]:3.0f}', end='\t')
+            print(f' {angles[j]:3.0f}', end='\t')
         print()
 
 
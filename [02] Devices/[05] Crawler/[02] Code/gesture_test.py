@@ -0,0 +1,63 @@
+#
+# gesture_test
+#
+# Version: 1.00
+# Date: 2025-08-16
+# Author: Sam Linton
+# Description: Checks of Gesture.get_angles. No hardware needed.
+#
+from gesture import Gesture
+
+def test_interpolation() -> None:
+    """Angles between time points are interpolated linearly."""
+    print('Testing interpolation...', end='')
+    gesture = Gesture(angles=[[0, 40, 90, 40, 0], [1, 2, 3, 4, 5]])
+    assert gesture.get_angles(0.0) == [0, 1]
+    assert gesture.get_angles(0.125) == [20, 1.5]
+    assert gesture.get_angles(0.5) == [90, 3]
+    assert gesture.get_angles(1.0) == [0, 5]
+    print('done.')
+
+def test_repeated_time_point() -> None:
+    """A repeated time point starts the later interval, whatever was looked up before."""
+    print('Testing repeated time point...', end='')
+    times = [0, 0.25, 0.5, 0.5, 1.0]
+
+    # Stepping forward onto the repeated time point
+    gesture = Gesture(angles=[[0, 40, 90, 40, 0], [1, 2, 3, 4, 5]], times=times)
+    for t in (0.0, 0.25, 0.4):
+        gesture.get_angles(t)
+    assert gesture.get_angles(0.5) == [40, 4]
+
+    # Coming from later in the gesture
+    gesture = Gesture(angles=[[0, 40, 90, 40, 0], [1, 2, 3, 4, 5]], times=times)
+    gesture.get_angles(0.9)
+    assert gesture.get_angles(0.5) == [40, 4]
+
+    # First lookup
+    gesture = Gesture(angles=[[0, 40, 90, 40, 0], [1, 2, 3, 4, 5]], times=times)
+    assert gesture.get_angles(0.5) == [40, 4]
+    print('done.')
+
+def test_lookup_order() -> None:
+    """Looking the times up in any order gives the same angles as stepping forward."""
+    print('Testing lookup order...', end='')
+    times = [0, 0.1, 0.1, 0.1, 0.4, 0.7, 0.7, 1.0]
+    angles = [[0, 10, 20, 30, 40, 50, 60, 70]]
+    steps = [n / 20 for n in range(21)]
+    forward = [Gesture(angles=angles, times=times).get_angles(t) for t in steps]
+    gesture = Gesture(angles=angles, times=times)
+    expected = [gesture.get_angles(t) for t in steps]
+    assert forward == expected
+    for t, angle in reversed(list(zip(steps, expected))):
+        assert gesture.get_angles(t) == angle
+    for n in range(21):
+        k = (7 * n) % 21
+        assert gesture.get_angles(steps[k]) == expected[k]
+    print('done.')
+
+
+if __name__ == "__main__":
+    test_interpolation()
+    test_repeated_time_point()
+    test_lookup_order()
@@ -7,22 +7,26 @@
 # Description: Represents a set of servos controlled by a PCA9685 I2C servo controller.
 #
 # TODO: 
-# - use actual time for movement, not just sleep.
 # - perhaps make multiple move method use entire array, not just specified indices.
 # - can't execute_gesture be derived from async_execute_gesture?
 #
-import ustruct # type: ignore
 from machine import I2C, Pin # type: ignore
-from time import sleep, sleep_us, ticks_us # type: ignore
+from time import sleep # type: ignore
 import uasyncio as asyncio # type: ignore
+from servo_controller import ServoController
+from pulse_converter import PulseConverter
 from servo_info import ServoInfo
 from gesture import Gesture
+from compiled_gesture import CompiledGesture
+from trajectory import Trajectory, MoveStats
 
 class ServoList:
     """Uses the PCA9685 to control a set of servos.
     In this class, "angle" refers to the logical angle of the servo, which is a value that is
     determined by the application. The physical angle of the servo is referred to as "servo_angle".
     """
+    MAX_COMPILED_GESTURES: int = 8 # Compiled gestures kept
+
     def __init__(self, 
                  i2c: I2C, # type: ignore
                  servo_infos: list[ServoInfo],
@@ -50,48 +54,40 @@ class ServoList:
         self._slope: float = (max_duty - min_duty) / max_angle_deg
         self._offset: float = min_duty
 
-        self.reset()
-        self.set_freq(freq)
+        # Integer conversion from logical angle straight to duty for each servo
+        self._converters: list[PulseConverter] = [self._create_converter(servo_info) for servo_info in servo_infos]
+
+        # PCA9685 driver; resets the device, sets the frequency and holds the register image
+        self._servo_controller: ServoController = ServoController(i2c, address=address, freq=freq)
+
+        # Timing of the last move
+        self._move_stats: MoveStats = MoveStats()
+
+        # Gestures already compiled, keyed by (gesture, number of steps), with the keys
+        # from least to most recently used
+        self._compiled_gestures: dict = {}
+        self._compiled_keys: list = []
         
-        # Set all servo angles
-        for servo_info in self._servo_infos:
-            servo_angle: float = self.read(servo_info.index)
-            servo_info.angle = servo_info.get_angle(servo_angle)
+        # Set all servo angles from the registers, which the controller has read in one burst
+        self._update_angles()
             
     def _us2duty(self, t_us: float, t_period_us: float) -> int:
         return int(4095 * t_us / t_period_us)
 
+    @property
+    def servo_controller(self) -> ServoController:
+        return self._servo_controller
+
+    @property
+    def move_stats(self) -> MoveStats:
+        """Timing of the last move, gesture or set of gesture repeats"""
+        return self._move_stats
+
     def reset(self) -> None:
-        self._write(0x00, 0x00) # Mode1
+        self._servo_controller.reset()
         
     def set_freq(self, freq: float):
-        prescale: int = int(25000000.0 / 4096.0 / freq + 0.5)
-        old_mode: int = self._read(0x00) # Mode 1
-        self._write(0x00, (old_mode & 0x7F) | 0x10) # Mode 1, sleep
-        self._write(0xfe, prescale) # Prescale
-        self._write(0x00, old_mode) # Mode 1
-        sleep_us(5)
-        self._write(0x00, old_mode | 0xa1) # Mode 1, autoincrement on
-        
-    def _write(self, address: int, value: int) -> None:
-        """Write value to the I2C address
-
-        Args:
-            address (int): I2C address
-            value (int): value
-        """
-        self._i2c.writeto_mem(self._address, address, bytearray([value])) # type: ignore
-
-    def _read(self, address: int) -> int:
-        """Read value from the I2C address
-
-        Args:
-            address (int): I2C address
-
-        Returns:
-            int: value read from the address
-        """
-        return self._i2c.readfrom_mem(self._address, address, 1)[0] # type: ignore
+        self._servo_controller.set_freq(freq)
         
     def write(self, index: int, angle: float) -> None:
         """Move the servo with the given index to the specified logical angle
@@ -100,22 +96,12 @@ class ServoList:
             index (int): index of the servo
             angle (float): logical angle in degrees to write to the servo
         """
-        servo_info: ServoInfo = self._servo_infos[index]
-        if not servo_info.angle_in_range(angle):
-            raise ValueError(f'Angle {angle} is out of range for servo {index}: {servo_info}.')
-        
-        # Find duty cycle from angle
-        servo_angle: float = servo_info.get_servo_angle(angle)
-        #print(f'write to angle {angle} servo angle {servo_angle}')
-        duty = self._servo_angle_to_duty(servo_angle)
-        address = 0x06 + 4 * index
-        
-        # Create data to write to I2C
-        data = ustruct.pack('<HH', 0, duty) # type: ignore
-        self._i2c.writeto_mem(self._address, address,  data) # type: ignore
+        # Sent immediately, or staged if a frame is open
+        self._servo_controller.set_duty(index, self._angle_to_duty(index, angle))
 
     def read(self, index: int) -> float:
-        """Read the logical angle from the servo with the given index
+        """Read the logical angle from the servo with the given index. The duty cycle comes from
+        the controller's copy of the registers, so there is no I2C transaction.
 
         Args:
             index (int): index of the servo
@@ -123,22 +109,32 @@ class ServoList:
         Returns:
             float: angle of the servo
         """
-        # Read the duty cycle from the servo
-        address = 0x06 + 4 * index
-        data = self._i2c.readfrom_mem(self._address, address, 4) 
-        duty: int = ustruct.unpack('<HH', data)[1]
+        duty: int = self._servo_controller.get_duty(index)
         servo_angle = self._duty_to_servo_angle(duty)
         angle = self._servo_infos[index].get_angle(servo_angle)
         return angle
 
-    def move_to_angle(self, index: int, angle: float, time: float | None = None, num_steps: int | None = None) -> None:
+    def read_all(self) -> list[float]:
+        """Read the registers of all servos from the device in one burst and update their angles
+
+        Returns:
+            list[float]: logical angle of each servo
+        """
+        self._servo_controller.read_frame()
+        self._update_angles()
+        return [servo_info.angle for servo_info in self._servo_infos]
+
+    def move_to_angle(self, index: int, angle: float, time: float | None = None, num_steps: int | None = None) -> MoveStats:
         """Move the specified servo to the given logical angle in the given time (seconds)
 
         Args:
             index (int) servo index
             angle (float) logical angle to move to in degrees
-            time (float): time (in seconds) to move between angles
+            time (float): time (in seconds) to move between angles. None moves immediately.
             num_steps (int): number of steps to take in the movement
+
+        Returns:
+            MoveStats: timing of the move
         """ 
         # Current servo
         servo_info = self._servo_infos[index]
@@ -147,110 +143,187 @@ class ServoList:
         if not servo_info.angle_in_range(angle):
             raise ValueError('new_angle is not within the range of the servo')
             
-        # Retrieve current angle
-        current_servo_angle = self.read(index)
-        current_angle = servo_info.get_angle(current_servo_angle)
+        # Current angle, as last written
+        start_angle: float = servo_info.angle
         
         if num_steps is None:
-            num_steps = abs(int(angle - current_angle)) # 1 degree per step 
-
-        # Incrementally move to the new angle
-        num_steps = max(1, num_steps)
-        angle_inc: float = (angle - current_angle) / num_steps
-        time_inc: float = time / (num_steps - 1)
-        for n in range(num_steps):
-            angle: float = current_angle + n * angle_inc
-            self.write(index, angle)
-            sleep(time_inc)
-
-    def move_to_angles(self, servo_angles: list[tuple[int, float]], time: float | None = None, num_steps: int = 100) -> None:
+            num_steps = abs(int(angle - start_angle)) # 1 degree per step 
+
+        def write_frame(t_norm: float) -> None:
+            new_angle: float = angle if t_norm >= 1.0 else start_angle + t_norm * (angle - start_angle)
+            self.write(index, new_angle)
+            servo_info.angle = new_angle
+
+        self._move_stats = Trajectory(write_frame).run(time, num_steps)
+        return self._move_stats
+
+    def move_to_angles(self, servo_angles: list[tuple[int, float]], time: float | None = None, num_steps: int = 100) -> MoveStats:
         """Move the specified servo to the given logical angles in the given time (seconds)
 
         Args:
             servo_angles: list of tuples (index, logical angle) for each servo
-            time (float): time (in seconds) to move between angles
+            time (float): time (in seconds) to move between angles. None moves immediately.
             num_steps (int): number of steps to take in the movement
+
+        Returns:
+            MoveStats: timing of the move
         """
+        indices: list[int] = [index for index, _ in servo_angles]
+        end_angles: list[float] = [angle for _, angle in servo_angles]
         
-        # Set starting angles for all servos
-        for index, _ in servo_angles:
-            self._servo_infos[index].angle = self.read(index)
-            
-        # Create time increment. Note: could be more sophisticated
-        num_steps = max(1, num_steps)
-        time_inc: float = time / (num_steps - 1)
-        
-        for n in range(num_steps, 0, -1):
-            
-            for index, angle_end in servo_angles:
-                servo_info = self._servo_infos[index]
-                
-                angle_inc = (angle_end - servo_info.angle) / n
-                new_angle: float = servo_info.angle + angle_inc
-                
-                self.write(index, new_angle)
-                servo_info.angle = new_angle
-                
-                sleep(time_inc)
+        # Starting angles for all servos, as last written
+        start_angles: list[float] = [self._servo_infos[index].angle for index in indices]
+        angles: list[float] = list(start_angles)
+
+        def write_frame(t_norm: float) -> None:
+            for i in range(len(indices)):
+                angles[i] = end_angles[i] if t_norm >= 1.0 else start_angles[i] + t_norm * (end_angles[i] - start_angles[i])
+            self._write_angles(indices, angles)
+
+        self._move_stats = Trajectory(write_frame).run(time, num_steps)
+        return self._move_stats
                 
-    def execute_gesture(self, gesture: Gesture, time: float, numsteps: int = 100, repeat: int = 1) -> None:
+    def execute_gesture(self, gesture: Gesture, time: float, numsteps: int = 100, repeat: int = 1) -> MoveStats:
         """Execute the gesture over the given time, breaking it into numsteps. Optionally repeat the gesture
         for a given number of times.
 
         Args:
             gesture (Gesture): prescribed motion of the servos over time
             time (float): amount of time to execute the gesture in seconds
-            numsteps (int, optional): Number of steps to execute, including start. Defaults to 100.
+            numsteps (int, optional): Number of steps to execute after the start. Defaults to 100.
+            repeat (int, optional): Number of times to execute the gesture. Defaults to 1.
+
+        Returns:
+            MoveStats: timing of all repeats together
         """
-        dt: float = time / numsteps
-        indices: list[int] = gesture.indices
-        
+        compiled: CompiledGesture = self.compile_gesture(gesture, numsteps)
+        compiled.reset()
+
+        def write_frame(t_norm: float) -> None:
+            compiled.write_frame(self._servo_controller, int(t_norm * compiled.num_steps + 0.5))
+
+        trajectory = Trajectory(write_frame)
+        stats = MoveStats()
         for _ in range(repeat):
-        
-            # Loop over all time points
-            for n in range(numsteps + 1):
-                t_norm: float = n / numsteps
-                angles: list[float] = gesture.get_angles(t_norm)
-
-                # Loop over all servos
-                t_start_us: float = ticks_us()
-                for i in range(len(indices)):
-                    index: int = indices[i]
-                    self.write(index, angles[i])
-
-                t_end_us: float = ticks_us()
-                dt_elapsed: float = 1.0e-06*(t_end_us - t_start_us)
-                sleep(max(0.0, dt - dt_elapsed))
-
-    async def async_execute_gesture(self, gesture: Gesture, time: float, numsteps: int = 100, repeat: int = 1) -> None:
+            compiled.write_frame(self._servo_controller, 0)
+            trajectory.run(time, compiled.num_steps, stats)
+        self._set_angles(compiled.indices, compiled.end_angles)
+
+        self._move_stats = stats
+        return stats
+
+    async def async_execute_gesture(self, gesture: Gesture, time: float, numsteps: int = 100, repeat: int = 1) -> MoveStats:
         """Execute the gesture over the given time, breaking it into numsteps
 
         Args:
             gesture (Gesture): prescribed motion of the servos over time
             time (float): amount of time to execute the gesture in seconds
-            numsteps (int, optional): Number of steps to execute, including start. Defaults to 100.
+            numsteps (int, optional): Number of steps to execute after the start. Defaults to 100.
+            repeat (int, optional): Number of times to execute the gesture. Defaults to 1.
+
+        Returns:
+            MoveStats: timing of all repeats together
         """
-        dt: float = time / numsteps
-        indices: list[int] = gesture.indices
-        
+        compiled: CompiledGesture = self.compile_gesture(gesture, numsteps)
+        compiled.reset()
+
+        def write_frame(t_norm: float) -> None:
+            compiled.write_frame(self._servo_controller, int(t_norm * compiled.num_steps + 0.5))
+
+        trajectory = Trajectory(write_frame)
+        stats = MoveStats()
         for _ in range(repeat):
-        
-            # Loop over all time points
-            for n in range(numsteps + 1):
-                t_norm: float = n / numsteps
-                angles: list[float] = gesture.get_angles(t_norm)
-
-                # Loop over all servos
-                t_start_us: float = ticks_us()
-                for i in range(len(indices)):
-                    index: int = indices[i]
-                    self.write(index, angles[i])
-
-                t_end_us: float = ticks_us()
-                dt_elapsed: float = 1.0e-06*(t_end_us - t_start_us)
-                dt_wait: int = int(1000.0 * max(0.0, dt - dt_elapsed))
-                await asyncio.sleep_ms(dt_wait)
+            compiled.write_frame(self._servo_controller, 0)
+            await trajectory.async_run(time, compiled.num_steps, stats)
+        self._set_angles(compiled.indices, compiled.end_angles)
+
+        self._move_stats = stats
+        return stats
+
+    def compile_gesture(self, gesture: Gesture, numsteps: int = 100) -> CompiledGesture:
+        """Precompute the register frames for the gesture, or return them if already compiled.
+        Raises ValueError if any angle of the gesture is out of range for its servo.
+        Only the MAX_COMPILED_GESTURES most recently used are kept.
+
+        Args:
+            gesture (Gesture): prescribed motion of the servos over time
+            numsteps (int, optional): Number of steps after the start. Defaults to 100.
+
+        Returns:
+            CompiledGesture: frames ready to send to the servo controller
+        """
+        key = (gesture, numsteps)
+        compiled: CompiledGesture | None = self._compiled_gestures.get(key)
+        if compiled is None:
+            compiled = CompiledGesture(gesture, numsteps, self._angle_to_duty)
+            if len(self._compiled_keys) >= self.MAX_COMPILED_GESTURES:
+                del self._compiled_gestures[self._compiled_keys.pop(0)]
+            self._compiled_gestures[key] = compiled
+        else:
+            self._compiled_keys.remove(key)
+        self._compiled_keys.append(key)
+        return compiled
+
+    def clear_compiled_gestures(self) -> None:
+        """Forget all compiled gestures, e.g. after changing a servo calibration."""
+        self._compiled_gestures = {}
+        self._compiled_keys = []
+
+    def _update_angles(self) -> None:
+        """Set the angle of every servo from the controller's copy of the registers"""
+        for index in range(len(self._servo_infos)):
+            self._servo_infos[index].angle = self.read(index)
+
+    def _set_angles(self, indices: list[int], angles: list[float]) -> None:
+        """Record the logical angles of servos written by other means than write()"""
+        for i in range(len(indices)):
+            self._servo_infos[indices[i]].angle = angles[i]
+
+    def _write_angles(self, indices: list[int], angles: list[float]) -> None:
+        """Write logical angles to the given servos, sending them all in one frame
+
+        Args:
+            indices (list[int]): servo indices
+            angles (list[float]): logical angle for each servo in indices
+        """
+        self._servo_controller.begin_frame()
+        try:
+            for i in range(len(indices)):
+                index: int = indices[i]
+                self.write(index, angles[i])
+                self._servo_infos[index].angle = angles[i]
+        finally:
+            self._servo_controller.commit()
     
+    def _angle_to_duty(self, index: int, angle: float) -> int:
+        """Convert the logical angle of the servo with the given index to a duty cycle
+
+        Args:
+            index (int): index of the servo
+            angle (float): logical angle in degrees
+
+        Raises:
+            ValueError: if the angle is out of range for the servo
+
+        Returns:
+            int: duty cycle [0, 4095]
+        """
+        servo_info: ServoInfo = self._servo_infos[index]
+        if not servo_info.angle_in_range(angle):
+            raise ValueError(f'Angle {angle} is out of range for servo {index}: {servo_info}.')
+        
+        return self._converters[index].to_output(angle)
+
+    def _create_converter(self, servo_info: ServoInfo) -> PulseConverter:
+        """Converter from the logical angle of the servo to duty, with its calibration folded in"""
+        servo_angle_0: float = servo_info.get_servo_angle(0.0)
+        servo_angle_per_deg: float = servo_info.get_servo_angle(1.0) - servo_angle_0
+        return PulseConverter(
+            self._offset + self._slope * servo_angle_0,
+            self._slope * servo_angle_per_deg,
+            -180.0,
+            180.0)
+
     def _servo_angle_to_duty(self, servo_angle_deg: float) -> int:
         """Convert the servo angle to a duty cycle
 
@@ -312,8 +385,9 @@ if __name__ == "__main__":
                 [-45, -45, 00, 45, 45,  00, -45, -45]
             ]
     )
-    asyncio.run(servo_list.async_execute_gesture(walk_gesture, time=2.0, numsteps=200, repeat=5))
+    stats = asyncio.run(servo_list.async_execute_gesture(walk_gesture, time=2.0, numsteps=200, repeat=5))
     print('done.')
+    print(stats)
 
 
 
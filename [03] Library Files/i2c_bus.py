@@ -0,0 +1,58 @@
+#
+# I2CBus
+#
+# Version: 1.00
+# Date: 2025-07-30
+# Author: Sam Linton
+# Description: Registry of I2C scan results, so each bus is scanned once
+#
+# Scanning probes all 112 addresses and takes several milliseconds, so drivers that
+# look for their device (e.g. MPU6050) share the result of the first scan of a bus
+# instead of scanning again. Call scan(i2c, refresh=True) after plugging in a device.
+#
+# Results are keyed by the I2C object itself, not its id(), so a new bus can never
+# pick up the scan of a collected one whose id was reused. The registry keeps the
+# bus alive; forget() drops it.
+#
+from machine import I2C
+
+
+class I2CBus:
+    _devices: dict = {}  # I2C -> addresses found
+
+    @classmethod
+    def scan(cls, i2c: I2C, refresh: bool = False) -> list[int]:
+        """Addresses of the devices on the bus, scanning only the first time.
+
+        Args:
+            i2c (I2C): bus
+            refresh (bool, optional): scan again even if the bus was scanned before. Defaults to False.
+
+        Returns:
+            list[int]: addresses found
+        """
+        if refresh or i2c not in cls._devices:
+            cls._devices[i2c] = i2c.scan()
+        return cls._devices[i2c]
+
+    @classmethod
+    def find(cls, i2c: I2C, addresses) -> list[int]:
+        """Those of the addresses that have a device on the bus."""
+        devices: list[int] = cls.scan(i2c)
+        return [address for address in addresses if address in devices]
+
+    @classmethod
+    def forget(cls, i2c: I2C) -> None:
+        """Drop the scan result of the bus, e.g. before discarding it."""
+        cls._devices.pop(i2c, None)
+
+
+if __name__ == '__main__':
+    from machine import Pin
+    from time import ticks_us, ticks_diff
+
+    i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400_000)
+    for _ in range(2):
+        t_start: int = ticks_us()
+        devices: list[int] = I2CBus.scan(i2c)
+        print(f'{[hex(device) for device in devices]} in {ticks_diff(ticks_us(), t_start)} us')
@@ -37,9 +37,12 @@ THE SOFTWARE.
 # At runtime try to continue returning last good data value. We don't want aircraft
 # crashing. However if the I2C has crashed we're probably stuffed.
 
-from utime import sleep_ms
+from utime import sleep_ms, ticks_ms
+from ustruct import unpack_from
+from array import array
 from machine import I2C
 from vector3d import Vector3d
+from i2c_bus import I2CBus
 
 
 class MPUException(OSError):
@@ -69,6 +72,9 @@ class MPU6050(object):
     _I2Cerror = "I2C failure when communicating with IMU"
     _mpu_addr = (104, 105)  # addresses of MPU9150/MPU6050. There can be two devices
     _chip_id = 104
+    _settle_ms = 200        # Time after power up before the device can be used
+    _accel_scales = (16384, 8192, 4096, 2048)  # LSB per g for each accel_range
+    _gyro_scales = (131, 65.5, 32.8, 16.4)     # LSB per degree/s for each gyro_range
 
     def __init__(self, side_str, device_addr=None, transposition=(0, 1, 2), scaling=(1, 1, 1)):
 
@@ -78,8 +84,21 @@ class MPU6050(object):
         self.buf2 = bytearray(2)                # be done in interrupt handlers
         self.buf3 = bytearray(3)
         self.buf6 = bytearray(6)
-
-        sleep_ms(200)                           # Ensure PSU and device have settled
+        self.buf14 = bytearray(14)              # Accel, temperature and gyro in one read
+        self._temperature = 0.0                 # Temperature from the last snapshot
+        self._accel_range = 0                   # Ranges as configured, and their scale factors, so
+        self._gyro_range = 0                    # samples don't need a register read to be scaled
+        self._accel_scale = self._accel_scales[0]
+        self._gyro_scale = self._gyro_scales[0]
+        self.fifo_accel = array('f')            # FIFO samples from read_fifo, 3 values per sample
+        self.fifo_gyro = array('f')
+        self.fifo_overflows = 0
+        self._fifo_buf = None
+        self._fifo_period = 0.0
+
+        uptime = ticks_ms()
+        if uptime < self._settle_ms:            # Ensure PSU and device have settled
+            sleep_ms(self._settle_ms - uptime)
         if isinstance(side_str, str):           # Non-pyb targets may use other than X or Y
             self._mpu_i2c = I2C(side_str)
         elif hasattr(side_str, 'readfrom'):     # Soft or hard I2C instance. See issue #3097
@@ -87,19 +106,20 @@ class MPU6050(object):
         else:
             raise ValueError("Invalid I2C instance")
 
-        if device_addr is None:
-            devices = set(self._mpu_i2c.scan())
-            mpus = devices.intersection(set(self._mpu_addr))
+        if device_addr is None:                 # Scan results are shared by all drivers on the bus
+            mpus = I2CBus.find(self._mpu_i2c, self._mpu_addr)
             number_of_mpus = len(mpus)
             if number_of_mpus == 0:
                 raise MPUException("No MPU's detected")
             elif number_of_mpus == 1:
-                self.mpu_addr = mpus.pop()
+                self.mpu_addr = mpus[0]
             else:
                 raise ValueError("Two MPU's detected: must specify a device address")
+        elif device_addr in self._mpu_addr:     # Known I2C address: no scan at all
+            self.mpu_addr = device_addr
         else:
             if device_addr not in (0, 1):
-                raise ValueError('Device address must be 0 or 1')
+                raise ValueError('Device address must be 0, 1, 0x68 or 0x69')
             self.mpu_addr = self._mpu_addr[device_addr]
 
         self.chip_id                     # Test communication by reading chip_id: throws exception on error
@@ -109,6 +129,37 @@ class MPU6050(object):
         self.accel_range = 0                    # default to highest sensitivity
         self.gyro_range = 0                     # Likewise for gyro
 
+    @property
+    def accel_scale(self):
+        '''
+        Raw accelerometer counts per g at the current range
+        '''
+        return self._accel_scale
+
+    @property
+    def gyro_scale(self):
+        '''
+        Raw gyro counts per degree/s at the current range
+        '''
+        return self._gyro_scale
+
+    def refresh_config(self):
+        '''
+        Re-reads the accelerometer and gyro ranges from the device into the
+        cached values, e.g. if something else may have reconfigured it.
+        '''
+        try:
+            self._read(self.buf1, 0x1C, self.mpu_addr)
+            accel_range = (self.buf1[0] // 8) & 3
+            self._read(self.buf1, 0x1B, self.mpu_addr)
+            gyro_range = (self.buf1[0] // 8) & 3
+        except OSError:
+            raise MPUException(self._I2Cerror)
+        self._accel_range = accel_range
+        self._accel_scale = self._accel_scales[accel_range]
+        self._gyro_range = gyro_range
+        self._gyro_scale = self._gyro_scales[gyro_range]
+
     # read from device
     def _read(self, buf, memaddr, addr):        # addr = I2C device address, memaddr = memory location within the I2C device
         '''
@@ -180,6 +231,50 @@ class MPU6050(object):
             raise MPUException(self._I2Cerror)
         return bytes_toint(self.buf2[0], self.buf2[1])/340 + 35  # I think
 
+    @property
+    def cached_temperature(self):
+        '''
+        Returns the temperature in degree C from the last snapshot, without
+        reading the device.
+        '''
+        return self._temperature
+
+    def snapshot(self):
+        '''
+        Reads accelerometer, temperature and gyro (registers 0x3B-0x48) in a
+        single transaction, so all values come from the same sample. Updates the
+        accel and gyro Vector3d objects and cached_temperature; read them without
+        further I2C traffic using accel.cached_xyz and gyro.cached_xyz, or the
+        first read of each of x, y and z.
+        '''
+        try:
+            self._read(self.buf14, 0x3B, self.mpu_addr)
+        except OSError:
+            raise MPUException(self._I2Cerror)
+        ax, ay, az, temp, gx, gy, gz = unpack_from('>7h', self.buf14)
+
+        accel = self._accel
+        accel._ivector[0] = ax
+        accel._ivector[1] = ay
+        accel._ivector[2] = az
+        scale = self._accel_scale
+        accel._vector[0] = ax / scale
+        accel._vector[1] = ay / scale
+        accel._vector[2] = az / scale
+        accel.refresh()
+
+        gyro = self._gyro
+        gyro._ivector[0] = gx
+        gyro._ivector[1] = gy
+        gyro._ivector[2] = gz
+        scale = self._gyro_scale
+        gyro._vector[0] = gx / scale
+        gyro._vector[1] = gy / scale
+        gyro._vector[2] = gz / scale
+        gyro.refresh()
+
+        self._temperature = temp / 340 + 35
+
     # passthrough
     @property
     def passthrough(self):
@@ -233,6 +328,120 @@ class MPU6050(object):
         except OSError:
             raise MPUException(self._I2Cerror)
 
+    # FIFO streaming. Accel and gyro are sampled by the device at a fixed rate and
+    # queued as 12 byte blocks (accel xyz, gyro xyz), so no sample is lost while the
+    # program is busy as long as read_fifo is called before the 1024 byte FIFO fills.
+    _FIFO_SIZE = 1024
+    _FIFO_BLOCK = 12
+
+    def start_fifo(self, sample_rate=100, max_samples=32):
+        '''
+        Start queueing accel and gyro samples in the FIFO at sample_rate Hz.
+        read_fifo decodes up to max_samples samples per call into fifo_accel
+        and fifo_gyro, which are allocated here. Setting passthrough stops
+        the FIFO, so set it before calling this.
+        '''
+        if sample_rate < 4 or sample_rate > 1000:
+            raise ValueError("Sample rate must be in range 4-1000 Hz")
+        if self.filter_range == 0:              # Gyro would sample at 8kHz, accel at 1kHz
+            self.filter_range = 1
+        rate = round(1000 / sample_rate) - 1
+        self.sample_rate = rate
+        self._fifo_period = (1 + rate) / 1000
+        self.fifo_accel = array('f', bytes(12 * max_samples))
+        self.fifo_gyro = array('f', bytes(12 * max_samples))
+        self._fifo_buf = memoryview(bytearray(self._FIFO_BLOCK * max_samples))
+        self.fifo_overflows = 0
+        try:
+            self._write(0x00, 0x23, self.mpu_addr)  # Nothing into the FIFO while resetting it
+            self._write(0x04, 0x6A, self.mpu_addr)  # FIFO_RESET
+            self._write(0x40, 0x6A, self.mpu_addr)  # FIFO_EN
+            self._write(0x78, 0x23, self.mpu_addr)  # Gyro x, y, z and accel
+        except OSError:
+            raise MPUException(self._I2Cerror)
+
+    def stop_fifo(self):
+        '''
+        Stop queueing samples and disable the FIFO.
+        '''
+        try:
+            self._write(0x00, 0x23, self.mpu_addr)
+            self._write(0x00, 0x6A, self.mpu_addr)
+        except OSError:
+            raise MPUException(self._I2Cerror)
+
+    @property
+    def fifo_period(self):
+        '''
+        Time between FIFO samples in seconds, as set by start_fifo
+        '''
+        return self._fifo_period
+
+    @property
+    def fifo_count(self):
+        '''
+        Number of bytes waiting in the FIFO
+        '''
+        try:
+            self._read(self.buf2, 0x72, self.mpu_addr)
+        except OSError:
+            raise MPUException(self._I2Cerror)
+        return (self.buf2[0] << 8 | self.buf2[1]) & 0x1FFF
+
+    def read_fifo(self):
+        '''
+        Drain whole samples from the FIFO in one burst and decode them into
+        fifo_accel (g) and fifo_gyro (degrees/s), sensor relative, 3 values per
+        sample: fifo_gyro[3 * i + 2] is gyro z of sample i. Returns the number
+        of samples, at most max_samples; call again if more may be waiting.
+        Samples are fifo_period apart. If the FIFO had filled up, it is reset,
+        fifo_overflows is incremented and 0 is returned.
+        '''
+        count = self.fifo_count
+        if count >= self._FIFO_SIZE:            # Oldest data overwritten, so blocks no longer line up
+            self.fifo_overflows += 1
+            try:
+                self._write(0x44, 0x6A, self.mpu_addr)  # FIFO_EN | FIFO_RESET
+            except OSError:
+                raise MPUException(self._I2Cerror)
+            return 0
+        num_samples = min(count // self._FIFO_BLOCK, len(self.fifo_accel) // 3)
+        if num_samples == 0:
+            return 0
+        buf = self._fifo_buf
+        try:
+            self._read(buf[:self._FIFO_BLOCK * num_samples], 0x74, self.mpu_addr)
+        except OSError:
+            raise MPUException(self._I2Cerror)
+
+        accel = self.fifo_accel
+        gyro = self.fifo_gyro
+        accel_scale = self._accel_scale
+        gyro_scale = self._gyro_scale
+        for i in range(num_samples):
+            ax, ay, az, gx, gy, gz = unpack_from('>6h', buf, self._FIFO_BLOCK * i)
+            j = 3 * i
+            accel[j] = ax / accel_scale
+            accel[j + 1] = ay / accel_scale
+            accel[j + 2] = az / accel_scale
+            gyro[j] = gx / gyro_scale
+            gyro[j + 1] = gy / gyro_scale
+            gyro[j + 2] = gz / gyro_scale
+        return num_samples
+
+    def load_fifo_sample(self, i):
+        '''
+        Set the accel and gyro Vector3d objects to sample i of the last
+        read_fifo, so accel.cached_xyz and gyro.cached_xyz return it with the
+        transposition, scaling and calibration applied.
+        '''
+        j = 3 * i
+        for axis in range(3):
+            self._accel._vector[axis] = self.fifo_accel[j + axis]
+            self._gyro._vector[axis] = self.fifo_gyro[j + axis]
+        self._accel.refresh()
+        self._gyro.refresh()
+
     # Low pass filters. Using the filter_range property of the MPU9250 is
     # harmless but gyro_filter_range is preferred and offers an extra setting.
     @property
@@ -271,16 +480,11 @@ class MPU6050(object):
     @property
     def accel_range(self):
         '''
-        Accelerometer range
+        Accelerometer range, as last set or read by refresh_config
         Value:              0   1   2   3
         for range +/-:      2   4   8   16  g
         '''
-        try:
-            self._read(self.buf1, 0x1C, self.mpu_addr)
-            ari = self.buf1[0]//8
-        except OSError:
-            raise MPUException(self._I2Cerror)
-        return ari
+        return self._accel_range
 
     @accel_range.setter
     def accel_range(self, accel_range):
@@ -295,6 +499,8 @@ class MPU6050(object):
                 self._write(ar_bytes[accel_range], 0x1C, self.mpu_addr)
             except OSError:
                 raise MPUException(self._I2Cerror)
+            self._accel_range = accel_range
+            self._accel_scale = self._accel_scales[accel_range]
         else:
             raise ValueError('accel_range can only be 0, 1, 2 or 3')
 
@@ -302,17 +508,11 @@ class MPU6050(object):
     @property
     def gyro_range(self):
         '''
-        Gyroscope range
+        Gyroscope range, as last set or read by refresh_config
         Value:              0   1   2    3
         for range +/-:      250 500 1000 2000  degrees/second
         '''
-        # set range
-        try:
-            self._read(self.buf1, 0x1B, self.mpu_addr)
-            gri = self.buf1[0]//8
-        except OSError:
-            raise MPUException(self._I2Cerror)
-        return gri
+        return self._gyro_range
 
     @gyro_range.setter
     def gyro_range(self, gyro_range):
@@ -327,6 +527,8 @@ class MPU6050(object):
                 self._write(gr_bytes[gyro_range], 0x1B, self.mpu_addr)  # Sets fchoice = b11 which enables filter
             except OSError:
                 raise MPUException(self._I2Cerror)
+            self._gyro_range = gyro_range
+            self._gyro_scale = self._gyro_scales[gyro_range]
         else:
             raise ValueError('gyro_range can only be 0, 1, 2 or 3')
 
@@ -349,10 +551,10 @@ class MPU6050(object):
         self._accel._ivector[0] = bytes_toint(self.buf6[0], self.buf6[1])
         self._accel._ivector[1] = bytes_toint(self.buf6[2], self.buf6[3])
         self._accel._ivector[2] = bytes_toint(self.buf6[4], self.buf6[5])
-        scale = (16384, 8192, 4096, 2048)
-        self._accel._vector[0] = self._accel._ivector[0]/scale[self.accel_range]
-        self._accel._vector[1] = self._accel._ivector[1]/scale[self.accel_range]
-        self._accel._vector[2] = self._accel._ivector[2]/scale[self.accel_range]
+        scale = self._accel_scale
+        self._accel._vector[0] = self._accel._ivector[0]/scale
+        self._accel._vector[1] = self._accel._ivector[1]/scale
+        self._accel._vector[2] = self._accel._ivector[2]/scale
 
     def get_accel_irq(self):
         '''
@@ -383,10 +585,10 @@ class MPU6050(object):
         self._gyro._ivector[0] = bytes_toint(self.buf6[0], self.buf6[1])
         self._gyro._ivector[1] = bytes_toint(self.buf6[2], self.buf6[3])
         self._gyro._ivector[2] = bytes_toint(self.buf6[4], self.buf6[5])
-        scale = (131, 65.5, 32.8, 16.4)
-        self._gyro._vector[0] = self._gyro._ivector[0]/scale[self.gyro_range]
-        self._gyro._vector[1] = self._gyro._ivector[1]/scale[self.gyro_range]
-        self._gyro._vector[2] = self._gyro._ivector[2]/scale[self.gyro_range]
+        scale = self._gyro_scale
+        self._gyro._vector[0] = self._gyro._ivector[0]/scale
+        self._gyro._vector[1] = self._gyro._ivector[1]/scale
+        self._gyro._vector[2] = self._gyro._ivector[2]/scale
 
     def get_gyro_irq(self):
         '''
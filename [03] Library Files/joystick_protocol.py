@@ -0,0 +1,236 @@
+#
+# JoystickProtocol
+#
+# Version: 1.00
+# Date: 2025-08-12
+# Author: Sam Linton
+# Description: Binary frame for joystick messages, shared by the controllers and the robots
+#
+# A frame is 12 bytes, little endian:
+#
+#   byte  0     version (VERSION)
+#   byte  1     sequence number, 0 to 255, one more for every frame sent
+#   bytes 2-9   left x, left y, right x, right y: int16, centred at 0, -AXIS_MAX to AXIS_MAX
+#   byte  10    buttons: bit 0 left, bit 1 right, set while pressed
+#   byte  11    CRC-8 (polynomial 0x07) of bytes 0 to 10
+#
+# The CSV text it replaces was about 30 bytes, built and parsed with string
+# formatting and split(). JoystickEncoder packs each frame into the same bytearray
+# with pack_into, and JoystickState unpacks it with unpack_from into attributes, so
+# neither side allocates per message. A frame with the wrong length, version or CRC
+# is rejected and counted; gaps in the sequence numbers are counted as lost.
+#
+# encode_if_changed only packs a frame when a button changed, an axis moved more than
+# the deadband since the last frame or an axis came back to the centre, for
+# BLEServer's change-only sending. Axes within the deadband of the centre are sent as
+# 0, so a released stick always arrives centred, however slowly it came back.
+#
+from array import array
+from ustruct import pack_into, unpack_from
+
+VERSION: int = 1
+FRAME_SIZE: int = 12
+AXIS_MAX: int = 32767
+LEFT_BUTTON: int = 0x01
+RIGHT_BUTTON: int = 0x02
+
+_FORMAT: str = '<BBhhhhB'  # Everything but the CRC
+_CRC_INDEX: int = FRAME_SIZE - 1
+
+
+def _crc8_table() -> bytes:
+    table: bytearray = bytearray(256)
+    for i in range(256):
+        crc: int = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
+_CRC8_TABLE: bytes = _crc8_table()
+
+
+def crc8(data, length: int) -> int:
+    """CRC-8 (polynomial 0x07, initial value 0) of the first length bytes of data."""
+    table: bytes = _CRC8_TABLE
+    crc: int = 0
+    for i in range(length):
+        crc = table[crc ^ data[i]]
+    return crc
+
+
+def axis_from_u16(value: int) -> int:
+    """Convert an ADC.read_u16() reading (0 to 65535, centre 32768) to a frame axis."""
+    return max(-AXIS_MAX, value - 32768)
+
+
+class JoystickEncoder:
+    """Packs joystick readings into a frame, reusing one buffer."""
+
+    def __init__(self, deadband: int = 0) -> None:
+        """constructor
+
+        Args:
+            deadband (int, optional): axis movement since the last frame that encode_if_changed
+                ignores, and the distance from the centre it sends as 0. Defaults to 0.
+        """
+        self.buffer: bytearray = bytearray(FRAME_SIZE)
+        self.sequence: int = 0  # Sequence number of the next frame
+        self.deadband: int = deadband
+        self._axes: array = array('h', (0, 0, 0, 0))  # Axes of the last frame
+        self._buttons: int = -1  # Buttons of the last frame, -1 before the first
+
+    def encode(self, left_x: int, left_y: int, right_x: int, right_y: int, buttons: int) -> bytearray:
+        """Pack a frame. Axes outside -AXIS_MAX to AXIS_MAX are clamped.
+
+        Args:
+            left_x (int): left stick x
+            left_y (int): left stick y
+            right_x (int): right stick x
+            right_y (int): right stick y
+            buttons (int): LEFT_BUTTON and RIGHT_BUTTON bits of the pressed buttons
+
+        Returns:
+            bytearray: the frame. It is overwritten by the next call, so send it before then.
+        """
+        axes: array = self._axes
+        axes[0] = max(-AXIS_MAX, min(AXIS_MAX, left_x))
+        axes[1] = max(-AXIS_MAX, min(AXIS_MAX, left_y))
+        axes[2] = max(-AXIS_MAX, min(AXIS_MAX, right_x))
+        axes[3] = max(-AXIS_MAX, min(AXIS_MAX, right_y))
+        self._buttons = buttons & 0xFF
+        buffer: bytearray = self.buffer
+        pack_into(_FORMAT, buffer, 0, VERSION, self.sequence, axes[0], axes[1], axes[2], axes[3], self._buttons)
+        buffer[_CRC_INDEX] = crc8(buffer, _CRC_INDEX)
+        self.sequence = (self.sequence + 1) & 0xFF
+        return buffer
+
+    def encode_if_changed(self, left_x: int, left_y: int, right_x: int, right_y: int, buttons: int,
+                          force: bool = False) -> bytearray | None:
+        """Pack a frame as encode does, with axes within the deadband of the centre as 0,
+        but only if a button changed, an axis moved more than the deadband since the last
+        frame or an axis returned to 0.
+
+        Args:
+            force (bool, optional): pack a frame of the current state even if nothing changed,
+                e.g. for a keepalive. Defaults to False.
+
+        Returns:
+            bytearray | None: the frame, or None if nothing changed
+        """
+        deadband: int = self.deadband
+        if -deadband <= left_x <= deadband:
+            left_x = 0
+        if -deadband <= left_y <= deadband:
+            left_y = 0
+        if -deadband <= right_x <= deadband:
+            right_x = 0
+        if -deadband <= right_y <= deadband:
+            right_y = 0
+        if not force and (buttons & 0xFF) == self._buttons and \
+                self._unchanged(left_x, 0) and self._unchanged(left_y, 1) and \
+                self._unchanged(right_x, 2) and self._unchanged(right_y, 3):
+            return None
+        return self.encode(left_x, left_y, right_x, right_y, buttons)
+
+    def _unchanged(self, value: int, i: int) -> bool:
+        """True if the axis is within the deadband of the last frame and did not return to 0."""
+        last: int = self._axes[i]
+        return abs(value - last) <= self.deadband and (value != 0 or last == 0)
+
+
+class JoystickState:
+    """Latest joystick state, updated in place from received frames."""
+
+    def __init__(self) -> None:
+        self.sequence: int = -1  # Sequence number of the last good frame, -1 before the first
+        self.left_x: int = 0
+        self.left_y: int = 0
+        self.right_x: int = 0
+        self.right_y: int = 0
+        self.buttons: int = 0
+
+        # Frame statistics
+        self.frames: int = 0  # Good frames
+        self.errors: int = 0  # Frames rejected for length, version or CRC
+        self.lost: int = 0  # Frames missing from the sequence
+
+    @property
+    def left_button(self) -> bool:
+        return bool(self.buttons & LEFT_BUTTON)
+
+    @property
+    def right_button(self) -> bool:
+        return bool(self.buttons & RIGHT_BUTTON)
+
+    def decode(self, frame) -> bool:
+        """Check a frame and, if it is good, update the state from it.
+
+        Args:
+            frame (bytes): frame as received
+
+        Returns:
+            bool: True if the frame was good
+        """
+        if len(frame) != FRAME_SIZE or frame[0] != VERSION or crc8(frame, _CRC_INDEX) != frame[_CRC_INDEX]:
+            self.errors += 1
+            return False
+        (_, sequence, self.left_x, self.left_y, self.right_x, self.right_y,
+         self.buttons) = unpack_from(_FORMAT, frame)
+        if self.sequence >= 0 and sequence != self.sequence:
+            self.lost += (sequence - self.sequence - 1) & 0xFF
+        self.sequence = sequence
+        self.frames += 1
+        return True
+
+    def reset(self) -> None:
+        """Centre the sticks, release the buttons and clear the statistics, e.g. on disconnection."""
+        self.sequence = -1
+        self.left_x = 0
+        self.left_y = 0
+        self.right_x = 0
+        self.right_y = 0
+        self.buttons = 0
+        self.frames = 0
+        self.errors = 0
+        self.lost = 0
+
+    def __str__(self) -> str:
+        return (f'JoystickState: #{self.sequence} left ({self.left_x}, {self.left_y}) '
+                f'right ({self.right_x}, {self.right_y}) buttons {self.buttons:02b}, '
+                f'{self.frames} frames, {self.errors} errors, {self.lost} lost')
+
+
+if __name__ == '__main__':
+    from time import ticks_us, ticks_diff
+
+    encoder = JoystickEncoder()
+    state = JoystickState()
+
+    frame = encoder.encode(1000, -2000, 32767, -32767, LEFT_BUTTON)
+    print(f'{len(frame)} bytes: {bytes(frame).hex()}')
+    state.decode(frame)
+    print(state)
+
+    frame[3] ^= 0x10  # Corrupt it
+    print(f'Corrupted frame accepted: {state.decode(frame)}')
+
+    encoder.encode(0, 0, 0, 0, 0)  # Lost
+    state.decode(encoder.encode(0, 0, 0, 0, RIGHT_BUTTON))
+    print(state)
+
+    encoder.deadband = 500
+    print(f'Small move sent: {encoder.encode_if_changed(300, 0, 0, 0, RIGHT_BUTTON) is not None}')
+    print(f'Button change sent: {encoder.encode_if_changed(300, 0, 0, 0, 0) is not None}')
+    for value in (20000, 9000, 1900, 850, 0):
+        frame = encoder.encode_if_changed(value, 0, 0, 0, 0)
+        if frame is not None:
+            state.decode(frame)
+    print(f'Released stick: {state}')
+    print(f'Keepalive sent: {encoder.encode_if_changed(0, 0, 0, 0, 0, force=True) is not None}')
+
+    t_start = ticks_us()
+    for _ in range(100):
+        state.decode(encoder.encode(1, 2, 3, 4, 0))
+    print(f'Encode and decode: {ticks_diff(ticks_us(), t_start) // 100} us')
@@ -0,0 +1,128 @@
+#
+# PulseConverter
+#
+# Version: 1.00
+# Date: 2025-07-24
+# Author: Sam Linton
+# Description: Converts servo angles to pulse outputs (PCA9685 duty counts or PWM ns) with integer math
+#
+# The conversion is linear: output = out_0 + out_per_deg * angle. The coefficients are
+# turned into fixed point once, so that a conversion is
+#
+#     output = (c0 + c1 * angle_10) >> shift
+#
+# where angle_10 is the angle in tenths of a degree. The shift is chosen as large as
+# possible while keeping c0 + c1 * angle_10 below 2**30 over the angle range, so on
+# MicroPython the sum stays a small int and never allocates. Results are truncated like
+# int() on the float formula. Optionally every tenth of a degree in the range is
+# tabulated, which turns a conversion into a single array lookup.
+#
+from array import array
+
+class PulseConverter:
+    STEPS_PER_DEG: int = 10 # Angle resolution, steps per degree
+    MAX_SHIFT: int = 24
+    SMALL_INT_LIMIT: int = 1 << 30 # Largest magnitude kept for intermediate values
+
+    def __init__(self,
+                 out_0: float,
+                 out_per_deg: float,
+                 angle_min: float = 0.0,
+                 angle_max: float = 180.0,
+                 lookup_table: bool = False) -> None:
+        """constructor
+
+        Args:
+            out_0 (float): output at an angle of 0 degrees
+            out_per_deg (float): change in output per degree
+            angle_min (float, optional): lowest angle converted, deg. Defaults to 0.0.
+            angle_max (float, optional): highest angle converted, deg. Defaults to 180.0.
+            lookup_table (bool, optional): tabulate the range at 0.1 deg steps. Defaults to False.
+        """
+        self._out_0: float = out_0
+        self._out_per_deg: float = out_per_deg
+        if angle_min > angle_max:
+            angle_min, angle_max = angle_max, angle_min
+        self._angle_10_min: int = int(angle_min * PulseConverter.STEPS_PER_DEG) - 1
+        self._angle_10_max: int = int(angle_max * PulseConverter.STEPS_PER_DEG) + 1
+
+        # Largest shift that keeps the fixed point sum a small int over the range
+        angle_10_limit: int = max(abs(self._angle_10_min), abs(self._angle_10_max))
+        slope_10: float = out_per_deg / PulseConverter.STEPS_PER_DEG
+        shift: int = PulseConverter.MAX_SHIFT
+        while shift > 0 and (abs(out_0) + abs(slope_10) * angle_10_limit) * (1 << shift) >= PulseConverter.SMALL_INT_LIMIT:
+            shift -= 1
+        self._shift: int = shift
+        self._c1: int = round(slope_10 * (1 << shift))
+
+        # Bias by the worst rounding error of c1 so that exact outputs are not truncated down
+        self._c0: int = round(out_0 * (1 << shift)) + angle_10_limit // 2 + 1
+
+        self._table = None
+        if lookup_table:
+            self._table = self._create_table()
+
+    @classmethod
+    def from_range(cls, out_min: float, out_max: float, deg_min: float = 0.0, deg_max: float = 180.0, lookup_table: bool = False) -> 'PulseConverter':
+        """Converter that maps deg_min to out_min and deg_max to out_max."""
+        out_per_deg: float = (out_max - out_min) / (deg_max - deg_min)
+        return cls(out_min - out_per_deg * deg_min, out_per_deg, deg_min, deg_max, lookup_table)
+
+    @property
+    def shift(self) -> int:
+        return self._shift
+
+    @property
+    def out_per_deg(self) -> float:
+        return self._out_per_deg
+
+    @property
+    def has_table(self) -> bool:
+        return self._table is not None
+
+    def to_output(self, angle: float) -> int:
+        """Output for the angle in degrees, resolved to 0.1 deg."""
+        angle_10: int = round(angle * PulseConverter.STEPS_PER_DEG)
+        table = self._table
+        if table is not None:
+            i: int = angle_10 - self._angle_10_min
+            if 0 <= i < len(table):
+                return table[i]
+        return (self._c0 + self._c1 * angle_10) >> self._shift
+
+    def to_output_10(self, angle_10: int) -> int:
+        """Output for the angle in tenths of a degree. No float math at all."""
+        table = self._table
+        if table is not None:
+            i: int = angle_10 - self._angle_10_min
+            if 0 <= i < len(table):
+                return table[i]
+        return (self._c0 + self._c1 * angle_10) >> self._shift
+
+    def to_angle(self, output: int) -> float:
+        """Angle in degrees for the output; the inverse conversion, in floating point."""
+        return (output - self._out_0) / self._out_per_deg
+
+    def _create_table(self) -> array:
+        size: int = self._angle_10_max - self._angle_10_min + 1
+        outputs: list[int] = [(self._c0 + self._c1 * (self._angle_10_min + i)) >> self._shift for i in range(size)]
+        typecode: str = 'H' if min(outputs) >= 0 and max(outputs) < 65536 else 'l'
+        return array(typecode, outputs)
+
+    def __str__(self) -> str:
+        return f'PulseConverter: {self._out_0:.1f} + {self._out_per_deg:.3f}/deg, shift {self._shift}, ' + \
+            f'table: {len(self._table) if self._table is not None else 0} entries'
+
+
+if __name__ == '__main__':
+    # PCA9685 duty counts at 50 Hz for 544-2400 us over 0-180 deg
+    duty_converter = PulseConverter.from_range(111, 491)
+    print(duty_converter)
+    for angle in [0.0, 45.0, 90.0, 135.0, 180.0]:
+        print(f'{angle:5.1f} deg -> duty {duty_converter.to_output(angle)}')
+
+    # PWM duty in ns with a lookup table
+    ns_converter = PulseConverter.from_range(544_000, 2_400_000, lookup_table=True)
+    print(ns_converter)
+    for angle in [0.0, 45.0, 90.0, 135.0, 180.0]:
+        print(f'{angle:5.1f} deg -> {ns_converter.to_output(angle)} ns')
@@ -25,6 +25,7 @@ THE SOFTWARE.
 '''
 
 from utime import sleep_ms
+from array import array
 from math import sqrt, degrees, acos, atan2
 
 
@@ -40,10 +41,23 @@ class Vector3d(object):
     Represents a vector in a 3D space using Cartesian coordinates.
     Internally uses sensor relative coordinates.
     Returns vehicle-relative x, y and z values.
+    The corrected values are held in a preallocated array and recomputed in
+    place once per update. Each of x, y and z is read from the device at most
+    once per sample: reading an axis that was already read since the last
+    update triggers a new update.
+    Single-axis reads therefore return the last sample, whether from update()
+    or an IMU snapshot (refresh()), until that axis has been consumed, however
+    long ago the sample was taken. An axis not read since then returns the old
+    value while an axis read again returns a new one. xyz always returns one
+    sample, the last one if no axis has been read from it. Call update() first
+    for a fresh sample, and use cached_xyz for the last one without touching
+    the device.
     '''
     def __init__(self, transposition, scaling, update_function):
         self._vector = [0, 0, 0]
         self._ivector = [0, 0, 0]
+        self._cvector = array('f', (0, 0, 0))   # Calibrated, transposed and scaled
+        self._consumed = 7                      # Bit per axis, set once read since the last update
         self.cal = (0, 0, 0)
         self.argcheck(transposition, "Transposition")
         self.argcheck(scaling, "Scaling")
@@ -51,7 +65,7 @@ class Vector3d(object):
             raise ValueError('Transpose indices must be unique and in range 0-2')
         self._scale = scaling
         self._transpose = transposition
-        self.update = update_function
+        self._update_function = update_function
 
     def argcheck(self, arg, name):
         '''
@@ -60,48 +74,83 @@ class Vector3d(object):
         if len(arg) != 3 or not (type(arg) is list or type(arg) is tuple):
             raise ValueError(name + ' must be a 3 element list or tuple')
 
+    def update(self):
+        '''
+        Read a new sample from the device
+        '''
+        self._update_function()
+        self.refresh()
+
+    def refresh(self):
+        '''
+        Recompute the corrected values after _vector has been set, e.g. by an
+        IMU snapshot. Marks all axes unread.
+        '''
+        vector = self._vector
+        cal = self.cal
+        cvector = self._cvector
+        for i in range(3):
+            j = self._transpose[i]
+            cvector[i] = (vector[j] - cal[j]) * self._scale[i]
+        self._consumed = 0
+
     def calibrate(self, stopfunc, waitfunc=default_wait):
         '''
         calibration routine, sets cal
         '''
         self.update()
-        maxvec = self._vector[:]                # Initialise max and min lists with current values
-        minvec = self._vector[:]
+        maxvec = array('f', self._vector)       # Initialise max and min with current values
+        minvec = array('f', self._vector)
         while not stopfunc():
             waitfunc()
             self.update()
-            maxvec = list(map(max, maxvec, self._vector))
-            minvec = list(map(min, minvec, self._vector))
+            for i in range(3):
+                value = self._vector[i]
+                if value > maxvec[i]:
+                    maxvec[i] = value
+                if value < minvec[i]:
+                    minvec[i] = value
         self.cal = tuple(map(lambda a, b: (a + b)/2, maxvec, minvec))
+        self.refresh()
 
-    @property
-    def _calvector(self):
+    def _axis(self, i):
         '''
-        Vector adjusted for calibration offsets
+        Corrected value of axis i, updating first if it was already read
         '''
-        return list(map(lambda val, offset: val - offset, self._vector, self.cal))
+        bit = 1 << i
+        if self._consumed & bit:
+            self.update()
+        self._consumed |= bit
+        return self._cvector[i]
 
     @property
     def x(self):                                # Corrected, vehicle relative floating point values
-        self.update()
-        return self._calvector[self._transpose[0]] * self._scale[0]
+        return self._axis(0)
 
     @property
     def y(self):
-        self.update()
-        return self._calvector[self._transpose[1]] * self._scale[1]
+        return self._axis(1)
 
     @property
     def z(self):
-        self.update()
-        return self._calvector[self._transpose[2]] * self._scale[2]
+        return self._axis(2)
 
     @property
     def xyz(self):
-        self.update()
-        return (self._calvector[self._transpose[0]] * self._scale[0],
-                self._calvector[self._transpose[1]] * self._scale[1],
-                self._calvector[self._transpose[2]] * self._scale[2])
+        if self._consumed:
+            self.update()
+        self._consumed = 7
+        cvector = self._cvector
+        return (cvector[0], cvector[1], cvector[2])
+
+    @property
+    def cached_xyz(self):
+        '''
+        As xyz, but from the last update (e.g. an IMU snapshot) without
+        reading the device.
+        '''
+        cvector = self._cvector
+        return (cvector[0], cvector[1], cvector[2])
 
     @property
     def magnitude(self):